@@ -0,0 +1,223 @@
+"""Inter-annotator agreement per YAML control.
+
+Annotations are pivoted into one label matrix per control (reports x
+annotators, -1 where an annotator did not label a report) and every
+statistic is computed from that matrix with NumPy:
+
+- percent agreement: share of agreeing annotator pairs per report, averaged
+- Cohen's kappa: mean over annotator pairs (Light's kappa when more than two)
+- Fleiss' kappa: for any number of annotators per report
+- Krippendorff's alpha: nominal, or interval for sliders
+
+Radio, dropdown and checkbox values, slider positions and the CUIs
+confirmed (Match? ticked) in UMLS mapper fields are compared; free text and
+dates are not.
+"""
+import math
+from array import array
+
+import numpy as np
+
+from tasks import is_mapper, iter_controls
+
+AGREEMENT_TYPES = ("radio", "dropdown", "checkbox", "slider")
+
+
+def agreement_controls(task_config):
+    """Controls agreement is computed for, in task order."""
+    controls = []
+    seen = set()
+    for control in iter_controls(task_config["groups"]):
+        if control["label"] in seen:
+            continue
+        if control["type"] in AGREEMENT_TYPES or is_mapper(control):
+            seen.add(control["label"])
+            controls.append(control)
+    return controls
+
+
+def label_of(control, value):
+    """The comparable label of a saved value, or None when there is nothing to compare."""
+    if is_mapper(control):
+        # A CUI only counts once the annotator confirmed it, not when it was merely suggested
+        if not isinstance(value, dict) or not value.get("match_checkbox"):
+            return None
+        selection = value.get("umls_selection")
+        return selection.get("cui") or None if selection else None
+    if value is None or value == "":
+        return None
+    return value
+
+
+class LabelMatrices:
+    """Reports x annotators label codes per control, built in one pass over the records."""
+
+    def __init__(self, controls):
+        self.controls = controls
+        self.reports = {}     # report_id -> row
+        self.annotators = {}  # annotator -> column
+        self.categories = {control["label"]: {} for control in controls}  # label -> {value: code}
+        self._cells = {control["label"]: (array('l'), array('l'), array('l')) for control in controls}
+
+    def add(self, record):
+        row = self.reports.setdefault(record["report_id"], len(self.reports))
+        column = self.annotators.setdefault(record["annotator"], len(self.annotators))
+        annotation = record.get("annotation", {})
+        for control in self.controls:
+            label = label_of(control, annotation.get(control["label"]))
+            if label is None:
+                continue
+            categories = self.categories[control["label"]]
+            code = categories.setdefault(label, len(categories))
+            rows, columns, codes = self._cells[control["label"]]
+            rows.append(row)
+            columns.append(column)
+            codes.append(code)
+
+    def matrix(self, label):
+        """int matrix (reports x annotators) of category codes, -1 where missing."""
+        matrix = np.full((len(self.reports), len(self.annotators)), -1, dtype=np.int64)
+        rows, columns, codes = self._cells[label]
+        if rows:
+            # array('l') shares its buffer with a C long NumPy view, no copy
+            matrix[np.frombuffer(rows, dtype='l'), np.frombuffer(columns, dtype='l')] = np.frombuffer(codes, dtype='l')
+        return matrix
+
+
+def category_counts(matrix, categories):
+    """Reports x categories matrix of how many annotators chose each category."""
+    units = np.repeat(np.arange(matrix.shape[0]), matrix.shape[1])
+    codes = matrix.ravel()
+    present = codes >= 0
+    counts = np.bincount(units[present] * categories + codes[present], minlength=matrix.shape[0] * categories)
+    return counts.reshape(matrix.shape[0], categories).astype(np.float64)
+
+
+def percent_agreement(counts):
+    """Mean share of agreeing annotator pairs over reports with at least two labels."""
+    raters = counts.sum(axis=1)
+    pairable = raters >= 2
+    if not pairable.any():
+        return math.nan
+    agreeing = (counts[pairable] * (counts[pairable] - 1)).sum(axis=1)
+    return float(np.mean(agreeing / (raters[pairable] * (raters[pairable] - 1))))
+
+
+def fleiss_kappa(counts):
+    """Fleiss' kappa, allowing a different number of annotators per report."""
+    raters = counts.sum(axis=1)
+    pairable = raters >= 2
+    if not pairable.any():
+        return math.nan
+    counts, raters = counts[pairable], raters[pairable]
+    observed = np.mean((counts * (counts - 1)).sum(axis=1) / (raters * (raters - 1)))
+    proportions = counts.sum(axis=0) / raters.sum()
+    expected = float((proportions ** 2).sum())
+    if expected >= 1:
+        return math.nan
+    return float((observed - expected) / (1 - expected))
+
+
+def cohen_kappa(first, second, categories):
+    """Cohen's kappa between two annotators' code vectors (-1 = missing)."""
+    both = (first >= 0) & (second >= 0)
+    n = int(both.sum())
+    if n == 0:
+        return math.nan
+    confusion = np.bincount(first[both] * categories + second[both], minlength=categories * categories)
+    confusion = confusion.reshape(categories, categories).astype(np.float64)
+    observed = np.trace(confusion) / n
+    expected = float((confusion.sum(axis=1) * confusion.sum(axis=0)).sum()) / (n * n)
+    if expected >= 1:
+        return math.nan
+    return float((observed - expected) / (1 - expected))
+
+
+def pairwise_cohen_kappa(matrix, categories):
+    """Mean Cohen's kappa over annotator pairs that labelled at least one report in common."""
+    kappas = []
+    for i in range(matrix.shape[1]):
+        for j in range(i + 1, matrix.shape[1]):
+            kappa = cohen_kappa(matrix[:, i], matrix[:, j], categories)
+            if not math.isnan(kappa):
+                kappas.append(kappa)
+    return float(np.mean(kappas)) if kappas else math.nan
+
+
+def krippendorff_alpha(counts, values=None):
+    """Krippendorff's alpha from category counts; values (one number per category) selects the interval metric."""
+    raters = counts.sum(axis=1)
+    pairable = raters >= 2
+    if not pairable.any():
+        return math.nan
+    counts, raters = counts[pairable], raters[pairable]
+
+    # Coincidence matrix: o_ck = sum_u (n_uc * n_uk - [c == k] * n_uc) / (m_u - 1)
+    weighted = counts / (raters - 1)[:, None]
+    coincidences = counts.T @ weighted - np.diag(weighted.sum(axis=0))
+    marginals = coincidences.sum(axis=1)
+    total = marginals.sum()
+
+    if values is None:
+        distance = 1 - np.eye(len(marginals))
+    else:
+        values = np.asarray(values, dtype=np.float64)
+        distance = (values[:, None] - values[None, :]) ** 2
+
+    observed = (coincidences * distance).sum() / total
+    expected = (np.outer(marginals, marginals) * distance).sum() / (total * (total - 1))
+    if expected == 0:
+        return math.nan
+    return float(1 - observed / expected)
+
+
+def compute_agreement(records, task_config):
+    """Agreement statistics per control for an iterable of annotation records.
+
+    Returns one dict per control with the field label, its type, the number
+    of reports labelled by two or more annotators ("reports"), the number of
+    annotators and the four statistics (NaN when undefined).
+    """
+    controls = agreement_controls(task_config)
+    matrices = LabelMatrices(controls)
+    for record in records:
+        matrices.add(record)
+
+    results = []
+    for control in controls:
+        label = control["label"]
+        categories = matrices.categories[label]
+        matrix = matrices.matrix(label)
+        counts = category_counts(matrix, max(len(categories), 1))
+
+        values = None
+        if control["type"] == "slider":
+            values = [value for value, _ in sorted(categories.items(), key=lambda item: item[1])]
+
+        results.append({
+            "field": label,
+            "type": "mapper" if is_mapper(control) else control["type"],
+            "reports": int((counts.sum(axis=1) >= 2).sum()),
+            "annotators": int((matrix >= 0).any(axis=0).sum()),
+            "percent_agreement": percent_agreement(counts),
+            "cohen_kappa": pairwise_cohen_kappa(matrix, max(len(categories), 1)),
+            "fleiss_kappa": fleiss_kappa(counts),
+            "krippendorff_alpha": krippendorff_alpha(counts, values),
+        })
+    return results
+
+
+def format_agreement(results):
+    """Plain-text table of compute_agreement results."""
+    def number(value):
+        return "     n/a" if math.isnan(value) else f"{value:8.3f}"
+
+    width = max([len(result["field"]) for result in results] + [len("Field")])
+    lines = [f"{'Field':<{width}}  Reports  Coders  Agree %   Cohen κ  Fleiss κ   Kripp α"]
+    for result in results:
+        agree = "     n/a" if math.isnan(result["percent_agreement"]) else f"{result['percent_agreement'] * 100:7.1f}%"
+        lines.append(
+            f"{result['field']:<{width}}  {result['reports']:7d}  {result['annotators']:6d}  {agree}  "
+            f"{number(result['cohen_kappa'])}  {number(result['fleiss_kappa'])}  {number(result['krippendorff_alpha'])}"
+        )
+    return "\n".join(lines)
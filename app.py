@@ -1,23 +1,47 @@
 import sys
-import csv
+import time
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("export", "validate", "merge", "stats", "agreement"):
+    # Batch commands (see cli.py) run headless, without importing Qt
+    import cli
+    sys.exit(cli.main())
+
+IMPORT_START = time.perf_counter()
+
+import re
 import json
-import yaml
 import os
 import argparse
 import datetime
-from dateutil import parser as dateparser
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTextEdit, QPushButton, QLabel, QProgressBar, QGroupBox,
-    QSlider, QRadioButton, QCheckBox, QButtonGroup, QMessageBox,
+    QCheckBox, QMessageBox,
     QLineEdit, QComboBox, QSplitter, QFileDialog, QDialog, 
-    QAction, QDesktopWidget, QCompleter, QScrollArea,
-    QSizePolicy, QFrame, QDateEdit, QGridLayout, QToolButton,
-    QProgressDialog, QShortcut
+    QAction, QDesktopWidget, QScrollArea,
+    QSizePolicy, QFrame, QGridLayout, QToolButton,
+    QShortcut, QListWidget, QListWidgetItem
 )
-from PyQt5.QtCore import Qt, QDate, QThread, pyqtSignal, QEventLoop
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap, QKeySequence
 
+from reports import DEFAULT_HEADERS, LazyReportIndex, PatientIndex, load_reports, describe_date_info
+from umls import (
+    DEFAULT_HOST, DEFAULT_PORT, PrelinkIndex, UMLSCache, UMLSClient,
+    cached_link, link_text, linker_version, load_linker, parse_address, prelink_path
+)
+from storage import AnnotationStore, BACKENDS, backend_for_path, open_backend
+from controls import MapperControl, create_control
+from viewer import ReportViewer
+from tasks import read_task_config
+from export import export_csv, export_parquet
+from metrics import Metrics, PhaseTimer
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_START
+
 class QHLine(QFrame):
     def __init__(self):
         super().__init__()
@@ -25,18 +49,253 @@ class QHLine(QFrame):
         self.setFrameShadow(QFrame.Sunken)
         self.setStyleSheet("color: #ccc;")
 
-class UMLSMapperLoader(QThread):
-    finished = pyqtSignal(object)
+class UMLSSearchWorker(QThread):
+    """Runs UMLS searches off the GUI thread.
+
+    On first use it connects to a linking server, or loads the linker in this
+    thread when none is running. Only the newest queued request per field is
+    kept; results of superseded requests are dropped by the caller.
+    """
+    loading = pyqtSignal(str)
+    result = pyqtSignal(int, object, str)  # request id, candidates, cache summary
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, server_address, parent=None):
+        super().__init__(parent)
+        self.server_address = server_address
+        self.client = None
+        self.nlp = None
+        self.cache = None
+        self._pending = OrderedDict()  # field key -> (request_id, text)
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    def submit(self, key, request_id, text):
+        with self._condition:
+            self._pending.pop(key, None)
+            self._pending[key] = (request_id, text)
+            self._condition.notify_all()
+
+    def cancel(self, key=None):
+        """Drop the queued request for a field, or all queued requests."""
+        with self._condition:
+            if key is None:
+                self._pending.clear()
+            else:
+                self._pending.pop(key, None)
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._pending.clear()
+            self._condition.notify_all()
+
+    def _ensure_linker(self):
+        if self.client is not None or self.nlp is not None:
+            return
+        # Prefer a running linking server over loading the linker in this process
+        client = UMLSClient(*self.server_address)
+        if client.is_available():
+            self.client = client
+            self.cache = UMLSCache(client.version)
+        else:
+            self._load_linker()
+            self.cache = UMLSCache(linker_version())
+
+    def _load_linker(self):
+        self.loading.emit("Downloading UMLS linker, this takes some time...")
+        self.nlp = load_linker()
+
+    def _search(self, text):
+        if self.client is not None:
+            try:
+                return cached_link(self.cache, self.client.search, text)
+            except OSError:
+                # The search failed; retry once if the server still answers, else link here.
+                # The cache is kept either way.
+                client = UMLSClient(*self.server_address)
+                self.client = client if client.is_available() else None
+                if self.client is not None:
+                    return cached_link(self.cache, self.client.search, text)
+                if self.nlp is None:
+                    self._load_linker()
+        return cached_link(self.cache, lambda t, limit: link_text(self.nlp, t, limit), text)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                _, (request_id, text) = self._pending.popitem(last=False)
+
+            try:
+                self._ensure_linker()
+                candidates = self._search(text)
+                self.result.emit(request_id, candidates, self.cache.describe())
+            except Exception as e:
+                self.failed.emit(request_id, str(e))
+
+class PrefetchWorker(QThread):
+    """Prepares upcoming views (report texts, pre-linked UMLS candidates) off the GUI thread.
+
+    Views are prepared in the order they were submitted; a new submit
+    replaces whatever was still queued.
+    """
+    ready = pyqtSignal(int, object, object)  # generation, view key, prepared view
+
+    def __init__(self, prepare, parent=None):
+        super().__init__(parent)
+        self.prepare = prepare
+        self._pending = OrderedDict()  # view key -> (generation, reports)
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    def submit(self, generation, views):
+        """Queue (key, reports) pairs, dropping anything queued earlier."""
+        with self._condition:
+            self._pending = OrderedDict((key, (generation, reports)) for key, reports in views)
+            self._condition.notify_all()
+
+    def cancel(self):
+        with self._condition:
+            self._pending.clear()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._pending.clear()
+            self._condition.notify_all()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                key, (generation, reports) = self._pending.popitem(last=False)
+
+            try:
+                self.ready.emit(generation, key, self.prepare(reports))
+            except Exception as e:
+                print(f"Failed to prefetch view: {str(e)}")
+
+class SearchIndexWorker(QThread):
+    """Opens the full-text index of the loaded reports, building it first if its sidecar is missing or stale."""
+    ready = pyqtSignal(int, object)  # generation, TextIndex
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, generation, csv_path, data, headers, parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.csv_path = csv_path
+        self.data = data
+        self.headers = headers
+        self.cancelled = threading.Event()
+
+    def stop(self):
+        self.cancelled.set()
+        self.wait()
 
     def run(self):
-        import spacy
-        from scispacy.linking import EntityLinker
-        nlp = spacy.blank("en")
-        nlp.add_pipe("scispacy_linker", config={
-            "resolve_abbreviations": True,
-            "linker_name": "umls"
-        })
-        self.finished.emit(nlp)
+        # Imported here: NumPy is not needed until the index is
+        from search import SearchCancelled, open_search_index
+        try:
+            index = open_search_index(self.csv_path, self.data, self.headers, cancelled=self.cancelled)
+        except SearchCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+            return
+        self.ready.emit(self.generation, index)
+
+class SaveWorker(QThread):
+    """Writes queued saves to the storage backend in order, off the GUI thread.
+
+    Saves that arrive while a write is running, or within DEBOUNCE_SECONDS of
+    each other, are coalesced into one write. A failed write stays queued and
+    is retried together with the next save.
+    """
+    saved = pyqtSignal(int)  # saves still pending
+    failed = pyqtSignal(str)
+
+    DEBOUNCE_SECONDS = 0.2
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self._queue = []  # (records, all_records) per save, oldest first
+        self._writing = False
+        self._failed = False
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    def submit(self, records, all_records):
+        with self._condition:
+            self._queue.append((records, all_records))
+            self._failed = False
+            self._condition.notify_all()
+
+    def pending(self):
+        with self._condition:
+            return len(self._queue) + int(self._writing)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while (not self._queue or self._failed) and not self._stopping:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+
+                # Give rapid consecutive saves a moment to arrive and coalesce
+                deadline = time.monotonic() + self.DEBOUNCE_SECONDS
+                while not self._stopping and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+
+                batch, self._queue = self._queue, []
+                self._writing = True
+
+            # Later saves of the same annotator/report replace earlier ones
+            merged = {}
+            for records, _ in batch:
+                for record in records:
+                    key = (record["annotator"], record["report_id"])
+                    merged.pop(key, None)
+                    merged[key] = record
+            records, all_records = list(merged.values()), batch[-1][1]
+
+            error = None
+            try:
+                self.backend.save(records, all_records)
+            except Exception as e:
+                error = str(e)
+
+            with self._condition:
+                self._writing = False
+                if error is not None:
+                    self._queue.insert(0, (records, all_records))
+                    self._failed = True
+                pending = len(self._queue)
+                self._condition.notify_all()
+
+            if error is not None:
+                self.failed.emit(error)
+                if self._stopping:
+                    return
+            else:
+                self.saved.emit(pending)
+
+    def stop(self):
+        """Make a final attempt to write what is queued and stop the thread."""
+        with self._condition:
+            self._stopping = True
+            self._failed = False
+            self._condition.notify_all()
+        self.wait()
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -58,6 +317,25 @@ class SettingsDialog(QDialog):
         self.group_reports_check = QCheckBox("Show all reports for a patient at once")
         self.group_reports_check.setChecked(False)  # Default unchecked
         layout.addWidget(self.group_reports_check)
+
+        # Save mode option
+        self.journal_mode_check = QCheckBox("Append saves to a journal (faster for large annotation files)")
+        self.journal_mode_check.setChecked(False)
+        layout.addWidget(self.journal_mode_check)
+
+        # Report loading option
+        self.lazy_loading_check = QCheckBox("Read report texts from disk on demand (for very large CSV files)")
+        self.lazy_loading_check.setChecked(False)
+        layout.addWidget(self.lazy_loading_check)
+
+        # Storage backend option
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Storage backend:"))
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("JSON file", "json")
+        self.backend_combo.addItem("SQLite database (several annotators on one computer)", "sqlite")
+        backend_layout.addWidget(self.backend_combo, stretch=1)
+        layout.addLayout(backend_layout)
         
         # Add separator
         layout.addWidget(QLabel("File Paths:"))
@@ -109,7 +387,7 @@ class SettingsDialog(QDialog):
         yaml_layout.addWidget(self.yaml_browse_button)
         
         # Output file selection
-        self.output_label = QLabel("Output JSON File (leave empty for default):")
+        self.output_label = QLabel("Output JSON/SQLite File (leave empty for default):")
         self.output_path_edit = QLineEdit()
         self.output_browse_button = QPushButton("Browse...")
         output_layout = QHBoxLayout()
@@ -139,19 +417,24 @@ class SettingsDialog(QDialog):
         # Connect signals
         self.csv_browse_button.clicked.connect(lambda: self.browse_file(self.csv_path_edit, "CSV Files (*.csv)"))
         self.yaml_browse_button.clicked.connect(lambda: self.browse_file(self.yaml_path_edit, "YAML Files (*.yaml *.yml)"))
-        self.output_browse_button.clicked.connect(lambda: self.browse_file(self.output_path_edit, "JSON Files (*.json)", save=True))
+        self.output_browse_button.clicked.connect(lambda: self.browse_file(self.output_path_edit, "Annotation Files (*.json *.sqlite *.db)", save=True))
         self.ok_button.clicked.connect(self.accept)
         self.cancel_button.clicked.connect(self.reject)
     
     def get_settings(self):
         """Return all settings as a dictionary."""
+        storage_backend = self.backend_combo.currentData()
         output_path = self.output_path_edit.text()
         if not output_path:
-            output_path = os.path.join(os.getcwd(), "annotations.json")
+            default_name = "annotations.sqlite" if storage_backend == "sqlite" else "annotations.json"
+            output_path = os.path.join(os.getcwd(), default_name)
             
         return {
             'annotator_name': self.annotator_name.text().strip(),
             'group_patient_reports': self.group_reports_check.isChecked(),
+            'journal_mode': self.journal_mode_check.isChecked(),
+            'lazy_loading': self.lazy_loading_check.isChecked(),
+            'storage_backend': storage_backend,
             'csv': self.csv_path_edit.text(),
             'yaml': self.yaml_path_edit.text(),
             'output': output_path,
@@ -167,6 +450,10 @@ class SettingsDialog(QDialog):
         """Set all settings from a dictionary."""
         self.annotator_name.setText(settings.get('annotator_name', ''))
         self.group_reports_check.setChecked(settings.get('group_patient_reports', False))
+        self.journal_mode_check.setChecked(settings.get('journal_mode', False))
+        self.lazy_loading_check.setChecked(settings.get('lazy_loading', False))
+        backend_index = self.backend_combo.findData(settings.get('storage_backend', 'json'))
+        self.backend_combo.setCurrentIndex(max(backend_index, 0))
         self.csv_path_edit.setText(settings.get('csv', ''))
         self.yaml_path_edit.setText(settings.get('yaml', ''))
         self.output_path_edit.setText(settings.get('output', ''))
@@ -224,19 +511,94 @@ class AboutDialog(QDialog):
         
         self.setLayout(layout)
 
+class TextDialog(QDialog):
+    """Read-only monospace text, e.g. a table of statistics."""
+
+    def __init__(self, title, text, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(760, 420)
+
+        layout = QVBoxLayout()
+
+        table = QTextEdit()
+        table.setReadOnly(True)
+        table.setLineWrapMode(QTextEdit.NoWrap)
+        table.setFont(QFont("Monospace"))
+        table.setPlainText(text)
+        layout.addWidget(table)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button, alignment=Qt.AlignCenter)
+
+        self.setLayout(layout)
+
+# AnnotationApp methods timed when metrics are enabled
+INSTRUMENTED_METHODS = (
+    "load_data", "load_annotations", "save_annotations", "update_ui", "search_umls", "build_annotation_ui"
+)
+METRICS_FLUSH_MS = 30000
+
+SEARCH_DELAY_MS = 150
+SEARCH_RESULTS = 100  # Hits listed under the search bar
+
+# Prefetch looks at most this many views ahead per view it prepares, so a mostly
+# annotated dataset does not make every Next/Prev scan to the end
+PREFETCH_SCAN_FACTOR = 20
+
 class AnnotationApp(QMainWindow):
-    def __init__(self, csv_path=None, yaml_path=None, output_path=None):
+    def __init__(self, csv_path=None, yaml_path=None, output_path=None, journal_mode=False, storage_backend=None, lazy_loading=False,
+                 umls_server=(DEFAULT_HOST, DEFAULT_PORT), prefetch_depth=3, defer_loading=False,
+                 profile_startup=False, metrics_enabled=False):
         super().__init__()
+        init_start = time.perf_counter()
+        # Phase timings printed once the first project is loaded (--profile-startup)
+        self.startup_timer = None
+        self.first_view_start = None
+        if profile_startup:
+            self.startup_timer = PhaseTimer()
+            self.startup_timer.add("imports", IMPORT_SECONDS)
+        # Timings of the hot paths, for Help -> Performance (--metrics)
+        self.metrics = Metrics(enabled=metrics_enabled)
+        for name in INSTRUMENTED_METHODS:
+            self.metrics.instrument(self, name)
         self.setWindowTitle("Patient Report Annotator")
         self.current_index = 0
         self.data = []
         self.annotations = {}
-        self.button_groups = {}
         self.output_path = output_path or ""
         self.suppress_save_warnings = False
+        self.confirm_save = False  # Tell the user once the worker has written the last Save
         self.group_patient_reports = False
+        self.journal_mode = journal_mode  # Append saves to a JSONL journal instead of rewriting the output file
+        # Storage backend name ("json" or "sqlite"), guessed from the output extension if not given
+        self.storage_backend = storage_backend or backend_for_path(self.output_path)
+        self.backend = None
+        self.save_worker = None  # Writes saves to the backend in the background
+        self.lazy_loading = lazy_loading  # Index the CSV and read report texts on demand
+        self.report_index = None
+        self.umls_server = umls_server  # (host, port) of a shared UMLS linking server, if one runs
+        self.umls_worker = None  # Runs UMLS searches in the background, started on first search
+        self.prefetch_depth = prefetch_depth  # Upcoming views prepared in the background (0 disables)
+        self.prefetch_worker = None
+        self.prefetched = OrderedDict()  # view key -> prepared view, for the next prefetch_depth views
+        self.prefetch_generation = 0  # Bumped when data is reloaded so stale views are dropped
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.current_view = None  # Prepared view being shown, if it was prefetched
+        self.search_worker = None  # Opens or builds the full-text index after load_data
+        self.search_index = None  # TextIndex over self.data, once ready
+        self.search_generation = 0  # Bumped when data is reloaded so a stale index is dropped
+        self.umls_requests = {}  # request id -> (dropdown, match checkbox) awaiting results
+        self.umls_request_count = 0
+        self.prelink_index = None  # Candidates linked ahead of time by `umls.py prelink`, if available
+        self.date_info = {}  # Date format and fallback/unparseable counts from the last load
+        self.patient_index = None  # Row range and completion counts per patient, built by load_data
+        self.controls = {}
+        self.ui_sections = []  # (config key, widget, controls) per top-level YAML item, reused across rebuilds
         self.current_annotator_name = "Unnamed"
-        self.all_annotations = []  # Stores all annotations in flat list
+        self.annotation_store = AnnotationStore()  # All annotations, indexed by annotator/report/patient
         self.current_report_annotations = {}  # Current annotator's annotations for the report
 
         # Initialize settings with defaults
@@ -261,6 +623,27 @@ class AnnotationApp(QMainWindow):
         # Setup keybindings
         self.init_keybindings()
         
+        setup_end = time.perf_counter()
+        if self.startup_timer is not None:
+            self.startup_timer.add("window setup", setup_end - init_start)
+
+        if self.metrics.enabled:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(self.metrics.flush)
+            self.metrics_timer.start(METRICS_FLUSH_MS)
+
+        if defer_loading:
+            # Let the event loop paint the window before loading anything
+            self.statusBar().showMessage("Loading...")
+            QTimer.singleShot(0, lambda: self.start(csv_path, yaml_path, output_path, setup_end))
+        else:
+            self.start(csv_path, yaml_path, output_path, setup_end)
+
+    def start(self, csv_path, yaml_path, output_path, setup_end):
+        """Load the project given on the command line, or ask for one."""
+        if self.startup_timer is not None:
+            self.startup_timer.add("first paint", time.perf_counter() - setup_end)
+
         # If paths were provided via command line, try to initialize directly
         if csv_path and yaml_path:
             if self.validate_paths(csv_path, yaml_path, output_path):
@@ -281,6 +664,7 @@ class AnnotationApp(QMainWindow):
         QShortcut(QKeySequence("Ctrl+E"), self, self.save_annotations_to_csv)
         QShortcut(QKeySequence("Ctrl+Q"), self, self.close)
         QShortcut(QKeySequence("Ctrl+H"), self, self.show_about_dialog)
+        QShortcut(QKeySequence("Ctrl+F"), self, self.focus_search)
     
     def init_ui(self):
         """Initialize all UI components."""
@@ -294,11 +678,40 @@ class AnnotationApp(QMainWindow):
         # Create a splitter instead of direct layout
         layout = QSplitter(Qt.Horizontal)
         
-        # Left panel: Text display (monospace font)
-        self.text_display = QTextEdit()
-        self.text_display.setReadOnly(True)
+        # Left panel: search bar and results above the text display (monospace font)
+        left_panel = QWidget()
+        left_layout = QVBoxLayout(left_panel)
+        left_layout.setContentsMargins(2, 2, 2, 2)
+        left_layout.setSpacing(5)
+
+        search_layout = QHBoxLayout()
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search reports (Ctrl+F)...")
+        self.search_field.setClearButtonEnabled(True)
+        self.search_status = QLabel()
+        search_layout.addWidget(self.search_field, stretch=1)
+        search_layout.addWidget(self.search_status)
+        left_layout.addLayout(search_layout)
+
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(150)
+        self.search_results.hide()
+        left_layout.addWidget(self.search_results)
+
+        # Search as the user types, once they pause
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_field.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_field.returnPressed.connect(self.jump_to_first_result)
+        self.search_results.itemActivated.connect(self.jump_to_search_result)
+        self.search_results.itemClicked.connect(self.jump_to_search_result)
+
+        self.text_display = ReportViewer()
         self.text_display.setFont(QFont("Courier New", 10))
-        layout.addWidget(self.text_display)
+        left_layout.addWidget(self.text_display, stretch=1)
+        layout.addWidget(left_panel)
         
         # Right panel: Controls
         right_panel = QWidget()
@@ -377,6 +790,14 @@ class AnnotationApp(QMainWindow):
         main_layout = QHBoxLayout(central_widget)
         main_layout.addWidget(layout)
 
+        # Permanent status bar info about the loaded CSV
+        self.data_info_label = QLabel()
+        self.statusBar().addPermanentWidget(self.data_info_label)
+        self.save_status_label = QLabel()
+        self.statusBar().addPermanentWidget(self.save_status_label)
+        self.prefetch_label = QLabel()
+        self.statusBar().addPermanentWidget(self.prefetch_label)
+
         # Signals
         self.prev_button.clicked.connect(self.prev_entry)
         self.next_button.clicked.connect(self.next_entry)
@@ -396,6 +817,23 @@ class AnnotationApp(QMainWindow):
         save_csv_action = QAction("Save to CSV", self)
         save_csv_action.triggered.connect(self.save_annotations_to_csv)
         file_menu.addAction(save_csv_action)
+
+        save_parquet_action = QAction("Save to Parquet", self)
+        save_parquet_action.triggered.connect(self.save_annotations_to_parquet)
+        file_menu.addAction(save_parquet_action)
+
+        # Copy annotations between JSON and SQLite files
+        import_action = QAction("Import Annotations...", self)
+        import_action.triggered.connect(self.import_annotations)
+        file_menu.addAction(import_action)
+
+        export_action = QAction("Export Annotations...", self)
+        export_action.triggered.connect(self.export_annotations)
+        file_menu.addAction(export_action)
+
+        agreement_action = QAction("Inter-annotator Agreement", self)
+        agreement_action.triggered.connect(self.show_agreement_dialog)
+        file_menu.addAction(agreement_action)
             
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
@@ -404,6 +842,10 @@ class AnnotationApp(QMainWindow):
         # Help menu
         help_menu = menu_bar.addMenu("Help")
         
+        performance_action = QAction("Performance", self)
+        performance_action.triggered.connect(self.show_performance_dialog)
+        help_menu.addAction(performance_action)
+
         about_action = QAction("About", self)
         about_action.triggered.connect(self.show_about_dialog)
         help_menu.addAction(about_action)
@@ -412,12 +854,40 @@ class AnnotationApp(QMainWindow):
         dialog = AboutDialog(self)
         dialog.exec_()
     
+    def show_performance_dialog(self):
+        if not self.metrics.enabled:
+            text = "Timing is off. Start the app with --metrics to record how long loading, saving and navigating take."
+        else:
+            text = self.metrics.report()
+            if self.metrics.log_path:
+                text += f"\nEvery timing is also written to {self.metrics.log_path}"
+        TextDialog("Performance", text, self).exec_()
+
+    def show_agreement_dialog(self):
+        if not self.annotation_store:
+            QMessageBox.warning(self, "Warning", "No annotations to compare")
+            return
+        try:
+            # NumPy is only needed here, so it stays off the startup path
+            from agreement import compute_agreement, format_agreement
+            results = compute_agreement(self.annotation_store, self.task_config)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to compute agreement: {str(e)}")
+            return
+        if not results:
+            QMessageBox.information(self, "Agreement", "The task has no radio, dropdown, checkbox, slider or UMLS mapper fields")
+            return
+        TextDialog("Inter-annotator Agreement", format_agreement(results), self).exec_()
+
     def show_settings_dialog(self, initial=False):
         dialog = SettingsDialog(self)
         if not initial:
             dialog.set_settings({
                 'annotator_name': self.current_annotator_name,
                 'group_patient_reports': self.group_patient_reports,
+                'journal_mode': self.journal_mode,
+                'lazy_loading': self.lazy_loading,
+                'storage_backend': self.storage_backend,
                 'csv': self.csv_path,
                 'yaml': self.yaml_path,
                 'output': self.output_path,
@@ -447,6 +917,9 @@ class AnnotationApp(QMainWindow):
             self.output_path = settings['output']
             self.current_annotator_name = settings['annotator_name']
             self.group_patient_reports = settings['group_patient_reports']
+            self.journal_mode = settings['journal_mode']
+            self.lazy_loading = settings['lazy_loading']
+            self.storage_backend = settings['storage_backend']
             
             # Update headers in settings
             self.settings['headers'] = settings['headers']
@@ -467,29 +940,67 @@ class AnnotationApp(QMainWindow):
     def initialize_application(self):
         """Initialize the application with the selected files"""
         try:
-            # Load settings first
-            settings = self.load_settings()
-            if settings:
-                self.settings.update(settings)
+            with self.startup_phase("settings"):
+                # Load settings first
+                settings = self.load_settings()
+                if settings:
+                    self.settings.update(settings)
+                if self.output_path:
+                    self.metrics.log_path = os.path.join(os.path.dirname(self.output_path), 'annotator_metrics.jsonl')
             
-            self.task_config = self.load_task_config(self.yaml_path)
-            self.instructions.setPlainText(self.task_config.get("instructions", "No instructions provided."))
-            self.annotation_title.setText(f'<b>{self.task_config.get("name", "Annotations")}<b>')
+            with self.startup_phase("YAML"):
+                self.task_config = self.load_task_config(self.yaml_path)
+                self.instructions.setPlainText(self.task_config.get("instructions", "No instructions provided."))
+                self.annotation_title.setText(f'<b>{self.task_config.get("name", "Annotations")}<b>')
             
             # Load existing annotations
-            self.load_annotations()
+            with self.startup_phase("annotations"):
+                self.load_annotations()
 
-            self.load_data(self.csv_path)
-            self.build_annotation_ui()
+            with self.startup_phase("CSV"):
+                self.load_data(self.csv_path)
+            with self.startup_phase("UI build"):
+                self.build_annotation_ui()
+            # The "first view" phase ends when the view has been painted, see paintEvent
+            self.first_view_start = time.perf_counter()
             self.update_progress()
-            self.find_first_unannotated()
-            self.update_ui()
+            self.find_first_unannotated()  # Also shows the entry it finds
             
             # Enable UI elements now that we have valid files
             self.set_ui_enabled(True)
+            self.statusBar().clearMessage()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to initialize application: {str(e)}")
             self.set_ui_enabled(False)
+            self.first_view_start = None
+
+        if self.startup_timer is not None:
+            if self.first_view_start is None:
+                self.report_startup()
+            else:
+                self.update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_timer is not None and self.first_view_start is not None:
+            start, self.first_view_start = self.first_view_start, None
+            # Child widgets paint after the window in the same pass, so finish once that is done
+            QTimer.singleShot(0, lambda: self.report_startup(start))
+
+    def report_startup(self, first_view_start=None):
+        """Print the startup phase timings (--profile-startup), once."""
+        if self.startup_timer is None:
+            return
+        if first_view_start is not None:
+            self.startup_timer.add("first view", time.perf_counter() - first_view_start)
+        print(self.startup_timer.report())
+        self.startup_timer = None
+
+    def startup_phase(self, name):
+        """Time a step of the first project load when profiling startup."""
+        if self.startup_timer is None:
+            return nullcontext()
+        return self.startup_timer.phase(name)
     
     def set_ui_enabled(self, enabled):
         """Enable or disable UI elements"""
@@ -532,14 +1043,8 @@ class AnnotationApp(QMainWindow):
     def find_first_unannotated(self):
         """Find the first unannotated entry for current annotator."""
         for i, entry in enumerate(self.data):
-            report_id = entry["Report-ID"]
             # Check if current annotator has annotated this report
-            has_annotation = any(
-                a["report_id"] == report_id and 
-                a["annotator"] == self.current_annotator_name
-                for a in self.all_annotations
-            )
-            if not has_annotation:
+            if not self.annotation_store.has(self.current_annotator_name, entry["Report-ID"]):
                 self.current_index = i
                 self.update_ui()
                 return
@@ -551,33 +1056,16 @@ class AnnotationApp(QMainWindow):
         if not self.current_annotator_name or not self.data:
             return
             
-        # Get all annotations for current annotator
-        annotator_annotations = {
-            a["report_id"]: a for a in self.all_annotations 
-            if a["annotator"] == self.current_annotator_name
-        }
-        
         if self.group_patient_reports:
             # Group mode - count completed patients
-            patient_status = {}
-            for entry in self.data:
-                patient_id = entry["Patient-ID"]
-                report_id = entry["Report-ID"]
-                
-                if patient_id not in patient_status:
-                    patient_status[patient_id] = True
-                
-                if report_id not in annotator_annotations:
-                    patient_status[patient_id] = False
-            
-            completed_patients = sum(1 for status in patient_status.values() if status)
-            total_patients = len(patient_status)
+            completed_patients = self.patient_index.completed_count(self.current_annotator_name)
+            total_patients = len(self.patient_index.patients)
             
             self.progress_bar.setMaximum(total_patients)
             self.progress_bar.setValue(completed_patients)
         else:
             # Single report mode
-            annotated_count = len(annotator_annotations)
+            annotated_count = self.annotation_store.count(self.current_annotator_name)
             total_count = len(self.data)
             
             self.progress_bar.setMaximum(total_count)
@@ -593,295 +1081,293 @@ class AnnotationApp(QMainWindow):
     
     def load_task_config(self, yaml_path):
         """Load and validate YAML task file."""
-        try:
-            with open(yaml_path, 'r') as f:
-                config = yaml.safe_load(f)
-                if "groups" not in config:
-                    raise ValueError("YAML must contain 'groups' key.")
-                return config
-        except Exception as e:
-            raise ValueError(f"Invalid YAML: {str(e)}")
+        return read_task_config(yaml_path)
     
     def load_data(self, csv_path):
         """Load and validate CSV data, parsing dates."""
         try:
-            with open(csv_path, mode="r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                
-                # Get header names from settings
-                headers = self.settings.get('headers', {
-                    'patient_id': 'Patient-ID',
-                    'report_id': 'Report-ID',
-                    'report_date': 'Report-Date',
-                    'text': 'Text'
-                })
-                
-                # Verify required columns exist
-                required_columns = {
-                    headers['patient_id'],
-                    headers['report_id'],
-                    headers['report_date'],
-                    headers['text']
-                }
-                
-                if not required_columns.issubset(reader.fieldnames):
-                    raise ValueError(
-                        f"CSV must include columns matching: {', '.join(required_columns)}. "
-                        f"Found columns: {', '.join(reader.fieldnames)}"
-                    )
-                
-                self.data = []
-                for row in reader:
-                    try:
-                        # Store the original row data
-                        processed_row = dict(row)
-                        
-                        # Add standard field names to the row for internal use
-                        processed_row["Patient-ID"] = row[headers['patient_id']]
-                        processed_row["Report-ID"] = row[headers['report_id']]
-                        processed_row["Report-Date"] = row[headers['report_date']]
-                        processed_row["Text"] = row[headers['text']]
-                        
-                        # Convert date string to datetime object for sorting
-                        processed_row["_parsed_date"] = dateparser.parse(processed_row["Report-Date"])
-                        
-                        self.data.append(processed_row)
-                    except ValueError:
-                        processed_row["_parsed_date"] = datetime.datetime.min
-                        self.data.append(processed_row)
-                
-                # Sort all data by patient then date
-                self.data.sort(key=lambda x: (x["Patient-ID"], x["_parsed_date"]))
+            # Get header names from settings
+            headers = self.settings.get('headers', DEFAULT_HEADERS)
+
+            if self.report_index is not None:
+                self.report_index.close()
+                self.report_index = None
+
+            if self.lazy_loading:
+                # Keep only an offset index in memory; texts are read when displayed
+                self.report_index = LazyReportIndex(csv_path, headers)
+                self.data = self.report_index.load()
+                self.date_info = self.report_index.date_info
+            else:
+                self.data, self.date_info = load_reports(csv_path, headers)
+            self.patient_index = PatientIndex(self.data, self.annotation_store)
         except Exception as e:
             raise ValueError(f"Invalid CSV: {str(e)}")
+        finally:
+            # Views prepared for the previous data are of no use anymore
+            self.prefetch_generation += 1
+            self.prefetched.clear()
+            self.current_view = None
+            if self.prefetch_worker is not None:
+                self.prefetch_worker.cancel()
+
+        if self.prelink_index is not None:
+            self.prelink_index.close()
+            self.prelink_index = None
+        if os.path.exists(prelink_path(csv_path)):
+            try:
+                self.prelink_index = PrelinkIndex(prelink_path(csv_path))
+            except Exception as e:
+                print(f"Failed to open UMLS candidate index: {str(e)}")
+
+        self.start_search_index(csv_path, headers)
+
+        self.data_info_label.setText(describe_date_info(self.date_info))
+        if self.date_info.get("unparseable"):
+            QMessageBox.warning(
+                self, "Warning",
+                f"{self.date_info['unparseable']} report dates could not be parsed. "
+                "These reports are sorted first for their patient."
+            )
+
+    def start_search_index(self, csv_path, headers):
+        """Drop the index of the previous data and open (or build) the one for self.data in the background."""
+        self.stop_search_index()
+        self.search_generation += 1
+        self.search_status.setText("Indexing...")
+        self.search_worker = SearchIndexWorker(self.search_generation, csv_path, self.data, headers, self)
+        self.search_worker.ready.connect(self.on_search_index_ready)
+        self.search_worker.failed.connect(self.on_search_index_failed)
+        self.search_worker.start()
+
+    def stop_search_index(self):
+        if self.search_worker is not None:
+            self.search_worker.stop()
+            self.search_worker = None
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+
+    def on_search_index_ready(self, generation, index):
+        if generation != self.search_generation:
+            index.close()  # Built for data that has been replaced since
+            return
+        self.search_index = index
+        self.search_status.clear()
+        self.run_search()
+
+    def on_search_index_failed(self, generation, error):
+        if generation == self.search_generation:
+            self.search_status.setText("Search unavailable")
+            print(f"Failed to build search index: {error}")
+
+    def focus_search(self):
+        self.search_field.setFocus()
+        self.search_field.selectAll()
+
+    def run_search(self):
+        """List the reports matching the search bar."""
+        self.search_results.clear()
+        query = self.search_field.text()
+        if not query.strip():
+            self.search_results.hide()
+            if self.search_index is not None:
+                self.search_status.clear()
+            return
+        if self.search_index is None:
+            return  # Searched again once the index is ready
+
+        positions = self.search_index.search(query)
+        for position in positions[:SEARCH_RESULTS]:
+            report = self.data[position]
+            item = QListWidgetItem(
+                f"Report {report['Report-ID']} ({report['Report-Date']}) - Patient {report['Patient-ID']}")
+            item.setData(Qt.UserRole, position)
+            self.search_results.addItem(item)
+        self.search_results.setVisible(bool(positions))
+        if len(positions) > SEARCH_RESULTS:
+            self.search_status.setText(f"{len(positions)} reports, first {SEARCH_RESULTS} shown")
+        else:
+            self.search_status.setText(f"{len(positions)} report{'' if len(positions) == 1 else 's'}")
+
+    def jump_to_first_result(self):
+        self.search_timer.stop()
+        self.run_search()
+        if self.search_results.count():
+            self.jump_to_search_result(self.search_results.item(0))
+
+    def jump_to_search_result(self, item):
+        """Show the report of a search hit, with the first match selected."""
+        position = item.data(Qt.UserRole)
+        report = self.data[position]
+        if self.group_patient_reports:
+            # Group views start at the patient's first report
+            self.current_index = self.patient_index.ranges[report["Patient-ID"]][0]
+        else:
+            self.current_index = position
+        self.clear_controls()
+        self.update_ui()
+        self.update_progress()
+
+        index = next(i for i, shown in enumerate(self.current_patient_reports) if shown["Report-ID"] == report["Report-ID"])
+        words = re.findall(r"\w+", self.search_field.text())  # As the index tokenizes
+        match = re.search(r"\b" + re.escape(words[0]), self.report_text(report), re.IGNORECASE) if words else None
+        if match:
+            offset = len(self.text_display.report_header(report)) + match.start()
+            self.text_display.show_report(index, offset, len(match.group()))
+        else:
+            self.text_display.show_report(index)
+
+    def report_text(self, report):
+        """Return the free text of a report, reading it from disk in lazy mode."""
+        if self.current_view is not None and report["Report-ID"] in self.current_view["texts"]:
+            return self.current_view["texts"][report["Report-ID"]]
+        if self.report_index is not None:
+            return self.report_index.read_text(report)
+        return report["Text"]
     
     def build_annotation_ui(self):
-        """Recursively build UI from YAML groups with control tracking."""
-        self.controls = {}
-        self.button_groups = {}
-        self.required_controls = []
+        """Build UI from YAML groups, reusing the widgets of top-level items whose config is unchanged."""
+        self.cancel_umls_search()
 
-        # Clear existing annotation widgets
-        for i in reversed(range(self.annotation_layout.count())): 
-            widget = self.annotation_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.setParent(None)
+        # Reuse old sections by config; whatever is left over afterwards is destroyed
+        unused = {}
+        for section in self.ui_sections:
+            unused.setdefault(section[0], []).append(section)
 
-        self.add_controls(self.annotation_layout, self.task_config["groups"])
+        sections = []
+        for item in self.task_config["groups"]:
+            key = json.dumps(item, sort_keys=True, default=str)
+            if unused.get(key):
+                section = unused[key].pop(0)
+                for control in section[2].values():
+                    control.reset()
+            else:
+                section = self.build_section(key, item)
+            sections.append(section)
 
-    def add_controls(self, parent_layout, items):
+        for stale in unused.values():
+            for _, widget, _ in stale:
+                self.annotation_layout.removeWidget(widget)
+                widget.deleteLater()
+
+        # Put sections in YAML order; reinserting a widget already in place is a no-op
+        for position, (_, widget, _) in enumerate(sections):
+            if self.annotation_layout.indexOf(widget) != position:
+                self.annotation_layout.removeWidget(widget)
+                self.annotation_layout.insertWidget(position, widget)
+
+        self.ui_sections = sections
+        self.controls = {}
+        for _, _, controls in sections:
+            self.controls.update(controls)
+
+    def build_section(self, key, item):
+        """Build the widgets for one top-level YAML item; returns (key, widget, controls)."""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        controls = {}
+        self.add_controls(layout, [item], controls)
+        return key, widget, controls
+
+    def add_controls(self, parent_layout, items, controls, deferred=None):
         for item in items:
             if "controls" in item:  # Group
                 if item.get("collapsible", False):
                     # Create collapsible group
-                    group = self.create_collapsible_group(item)
+                    group = self.create_collapsible_group(item, controls, deferred)
                     parent_layout.addWidget(group)
                 else:
                     # Regular group
                     group = QGroupBox(item["label"])
                     sub_layout = QVBoxLayout()
-                    self.add_controls(sub_layout, item["controls"])
+                    self.add_controls(sub_layout, item["controls"], controls, deferred)
                     group.setLayout(sub_layout)
                     parent_layout.addWidget(group)
             elif "groups" in item:  # Nested Group
-                self.add_controls(parent_layout, item["groups"])
+                self.add_controls(parent_layout, item["groups"], controls, deferred)
             else:  # Control
-                label = item["label"]
-                parent_layout.addWidget(QLabel(label))
-                
-                if item["type"] == "slider":
-                    slider = QSlider(Qt.Horizontal)
-                    slider.setRange(item["min"], item["max"])
-                    slider.setValue(item["min"])  # Set default to min
-                    parent_layout.addWidget(slider)
-                    self.controls[label] = slider
-                    if item.get("required", False):
-                        self.required_controls.append(slider)
-                        
-                elif item["type"] == "radio":
-                    group = QButtonGroup()
-                    self.button_groups[label] = group
-                    for option in item["options"]:
-                        radio = QRadioButton(option)
-                        parent_layout.addWidget(radio)
-                        group.addButton(radio)
-                    self.controls[label] = group
-                    if item.get("required", False):
-                        self.required_controls.append(group)
-                        
-                elif item["type"] == "checkbox":
-                    checkbox = QCheckBox(label)
-                    parent_layout.addWidget(checkbox)
-                    self.controls[label] = checkbox
-                    if item.get("required", False):
-                        self.required_controls.append(checkbox)
-
-                elif item["type"] == "text" and item.get("mapper", False):
-                    # Create mapper control layout
-                    mapper_layout = QHBoxLayout()
-                    
-                    # Text field
-                    text_field = QLineEdit()
-                    text_field.setPlaceholderText(item.get("placeholder", ""))
-                    if "default" in item:
-                        text_field.setText(item["default"])
-                    mapper_layout.addWidget(text_field, stretch=2)
-                    
-                    # Update button
-                    update_button = QPushButton("🔍")
-                    update_button.setToolTip("Search UMLS")
-                    update_button.setFixedWidth(30)
-                    mapper_layout.addWidget(update_button)
-                    
-                    # Dropdown for UMLS results
-                    umls_dropdown = QComboBox()
-                    umls_dropdown.setFixedWidth(250)
-                    mapper_layout.addWidget(umls_dropdown, stretch=1)
-                    
-                    # Checkbox for match confirmation
-                    match_checkbox = QCheckBox("Match?")
-                    match_checkbox.setEnabled(False)
-                    mapper_layout.addWidget(match_checkbox)
-                    
-                    # Store references
-                    self.controls[label] = {
-                        'text': text_field,
-                        'dropdown': umls_dropdown,
-                        'update': update_button,
-                        'match_checkbox': match_checkbox
-                    }
-                    
-                    # Connect signals
-                    update_button.clicked.connect(
-                        lambda _, t=text_field, d=umls_dropdown, c=match_checkbox: 
-                        self.search_umls(t.text(), d, c))
-                    
-                    parent_layout.addLayout(mapper_layout)
-                elif item["type"] == "text":
-                    text_field = QLineEdit()
-                    text_field.setPlaceholderText(item.get("placeholder", ""))
-                    if "default" in item:
-                        text_field.setText(item["default"])
-                    parent_layout.addWidget(text_field)
-                    self.controls[label] = text_field
-                    if item.get("required", False):
-                        self.required_controls.append(text_field)
-                
-                elif item["type"] == "date":
-                    date_field = QDateEdit()
-                    date_field.setDisplayFormat("dd-MM-yyyy")
-                    date_field.setCalendarPopup(True)
-                    date_field.setDate(QDate(2000, 1, 1))
-                    parent_layout.addWidget(date_field)
-                    self.controls[label] = date_field
-                    if item.get("required", False):
-                        self.required_controls.append(date_field)
-
-                elif item["type"] == "dropdown":
-                    combo = QComboBox()
-                    combo.addItems(item["options"])
-                    if "default" in item and item["default"] in item["options"]:
-                        combo.setCurrentText(item["default"])
-                    parent_layout.addWidget(combo)
-                    self.controls[label] = combo
-                    if item.get("required", False):
-                        self.required_controls.append(combo)
-
-                elif item["type"] == "autocomplete":
-                    text_field = QLineEdit()
-                    text_field.setPlaceholderText(item.get("placeholder", "Start typing..."))
-                    
-                    # Create completer with options
-                    completer = QCompleter(item["options"])
-                    completer.setCaseSensitivity(Qt.CaseInsensitive)
-                    completer.setFilterMode(Qt.MatchContains)  # Match anywhere in string
-                    completer.setCompletionMode(QCompleter.PopupCompletion)
-                    text_field.setCompleter(completer)
-                    
-                    if "default" in item:
-                        text_field.setText(item["default"])
-                    
-                    parent_layout.addWidget(text_field)
-                    self.controls[label] = text_field
-                    if item.get("required", False):
-                        self.required_controls.append(text_field)
+                # Controls of a collapsed group exist before their widgets do
+                control = deferred.pop(id(item), None) if deferred else None
+                if control is None:
+                    control = create_control(item)
+                parent_layout.addWidget(QLabel(control.label))
+                control.build(parent_layout, self)
+                controls[control.label] = control
+
+    def create_controls(self, items, controls, deferred):
+        """Create controls without widgets, keyed by id of their YAML item in deferred."""
+        for item in items:
+            if "controls" in item:
+                self.create_controls(item["controls"], controls, deferred)
+            elif "groups" in item:
+                self.create_controls(item["groups"], controls, deferred)
+            else:
+                if id(item) not in deferred:
+                    deferred[id(item)] = create_control(item)
+                controls[item["label"]] = deferred[id(item)]
 
     def search_umls(self, text, dropdown, match_checkbox):
-        """Search UMLS for the given text and populate dropdown with results."""
-        try:
-            if not hasattr(self, 'nlp'):
-                # Initialize UMLS linker
-                loading_dialog = QProgressDialog("Downloading UMLS linker, this takes some time, please wait...", None, 0, 0, self)
-                loading_dialog.setCancelButton(None)
-                loading_dialog.setWindowModality(Qt.WindowModal)
-                loading_dialog.setWindowTitle("Loading")
-                loading_dialog.show()
-                QApplication.processEvents()
-
-                loop = QEventLoop()
-                nlp_container = {}
-
-                # Load the NLP model in a separate thread to avoid blocking the UI
-                def on_finished(nlp):
-                    nlp_container['nlp'] = nlp
-                    loop.quit()
-
-                loader = UMLSMapperLoader()
-                loader.finished.connect(on_finished)
-                loader.start()
-
-                loop.exec_()
-
-                loading_dialog.close()
-                self.nlp = nlp_container['nlp']
-
-            # Clear previous results
-            dropdown.clear()
-            match_checkbox.setEnabled(False)
-            match_checkbox.setChecked(False)
-            
-            if not isinstance(text, str) or not text.strip():
-                dropdown.addItem("No text entered")
-                return
-            
-            QApplication.processEvents()
-            
-            # Create a Doc object from the full string
-            doc = self.nlp(text)
-            
-            # Force a single-span entity over the entire string
-            span = doc.char_span(0, len(text), label="ENTITY")
-            if span is None:
-                dropdown.addItem("No match found")
-                return
-            
-            doc.ents = [span]
-            
-            # Run the linker
-            linker = self.nlp.get_pipe("scispacy_linker")
-            doc = linker(doc)
-            
-            ent = doc.ents[0]
-            if not ent._.kb_ents:
-                dropdown.addItem("No match found")
-                return
-            
-            # Get top 10 matches
-            for concept_id, score in ent._.kb_ents[:10]:
-                concept = linker.kb.cui_to_entity[concept_id]
-                display_text = f"{concept.canonical_name} (Score: {score:.2f}, CUI: {concept_id})"
-                dropdown.addItem(display_text, {
-                    'cui': concept_id,
-                    'canonical_name': concept.canonical_name,
-                    'score': score,
-                    'types': concept.types
-                })
-            
-            if dropdown.count() > 0:
-                match_checkbox.setEnabled(True)
-            
-        except Exception as e:
-            QMessageBox.warning(self, "UMLS Error", f"Failed to search UMLS: {str(e)}")
+        """Queue a UMLS search for text; results go to this dropdown/checkbox pair."""
+        self.cancel_umls_search(dropdown)
+
+        # Clear previous results
+        dropdown.clear()
+        match_checkbox.setEnabled(False)
+        match_checkbox.setChecked(False)
+        
+        if not isinstance(text, str) or not text.strip():
+            dropdown.addItem("No text entered")
+            return
+
+        if self.umls_worker is None:
+            self.umls_worker = UMLSSearchWorker(self.umls_server, self)
+            self.umls_worker.loading.connect(lambda message: self.statusBar().showMessage(message))
+            self.umls_worker.result.connect(self.on_umls_result)
+            self.umls_worker.failed.connect(self.on_umls_failed)
+            self.metrics.instrument(self.umls_worker, "_search", "search_umls (linker)")
+            self.umls_worker.start()
+
+        self.umls_request_count += 1
+        self.umls_requests[self.umls_request_count] = (dropdown, match_checkbox)
+        dropdown.addItem("Searching...")
+        self.umls_worker.submit(id(dropdown), self.umls_request_count, text)
+
+    def cancel_umls_search(self, dropdown=None):
+        """Forget pending searches for a dropdown (or all), so late results are dropped."""
+        for request_id, (pending_dropdown, _) in list(self.umls_requests.items()):
+            if dropdown is None or pending_dropdown is dropdown:
+                del self.umls_requests[request_id]
+        if self.umls_worker is not None:
+            self.umls_worker.cancel(None if dropdown is None else id(dropdown))
+
+    def on_umls_result(self, request_id, candidates, cache_summary):
+        target = self.umls_requests.pop(request_id, None)
+        if target is None:
+            return  # Superseded by a newer search or navigation
+        dropdown, match_checkbox = target
+        self.statusBar().showMessage(cache_summary, 5000)
+
+        dropdown.clear()
+        if not candidates:
+            dropdown.addItem("No match found")
+            return
+        
+        # Top 10 matches
+        for candidate in candidates:
+            display_text = f"{candidate['canonical_name']} (Score: {candidate['score']:.2f}, CUI: {candidate['cui']})"
+            dropdown.addItem(display_text, candidate)
+        
+        if dropdown.count() > 0:
+            match_checkbox.setEnabled(True)
+
+    def on_umls_failed(self, request_id, error):
+        target = self.umls_requests.pop(request_id, None)
+        if target is None:
+            return
+        target[0].clear()
+        QMessageBox.warning(self, "UMLS Error", f"Failed to search UMLS: {error}")
 
     def confirm_umls_selection(self, text_field, dropdown):
         """Handle confirmation of UMLS selection."""
@@ -889,7 +1375,7 @@ class AnnotationApp(QMainWindow):
             concept_id, canonical_name, score = dropdown.currentData()
             text_field.setText(canonical_name)
 
-    def create_collapsible_group(self, group_config):
+    def create_collapsible_group(self, group_config, controls, deferred=None):
         """Create a collapsible group box with toggle button on the right."""
         # Create a standard QGroupBox
         group = QGroupBox()
@@ -916,22 +1402,33 @@ class AnnotationApp(QMainWindow):
         header_layout.addStretch()
         header_layout.addWidget(toggle_button)
         
-        # Content area
+        # Content area, built the first time the group is expanded
         content = QWidget()
         content_layout = QVBoxLayout(content)
         content_layout.setContentsMargins(5, 5, 5, 5)
-        self.add_controls(content_layout, group_config["controls"])
+        expanded = group_config.get("initially_expanded", True)
+        if expanded:
+            self.add_controls(content_layout, group_config["controls"], controls, deferred)
+        else:
+            if deferred is None:
+                deferred = {}
+            self.create_controls(group_config["controls"], controls, deferred)
+        content_built = [expanded]
         
         # Add to main layout
         main_layout.addWidget(header)
         main_layout.addWidget(content)
         
         # Set initial state
-        content.setVisible(group_config.get("initially_expanded", True))
+        content.setVisible(expanded)
         
         # Connect toggle button
         def toggle_content():
             is_visible = not content.isVisible()
+            if is_visible and not content_built[0]:
+                self.add_controls(content_layout, group_config["controls"], controls, deferred)
+                content_built[0] = True
+                self.prefill_umls_candidates()
             content.setVisible(is_visible)
             toggle_button.setArrowType(Qt.DownArrow if is_visible else Qt.RightArrow)
         
@@ -949,131 +1446,214 @@ class AnnotationApp(QMainWindow):
 
         if self.group_patient_reports:
             # Get all reports for current patient
-            patient_reports = [r for r in self.data if r["Patient-ID"] == patient_id]
-            report_texts = []
-            
-            for report in patient_reports:
-                report_texts.append(
-                    f"=== Report {report['Report-ID']} ({report['Report-Date']}) ===\n\n"
-                    f"{report['Text']}\n\n"
-                )
-            
-            self.text_display.setPlainText("\n".join(report_texts))
-            self.current_patient_reports = patient_reports
+            self.current_patient_reports = self.patient_index.reports(self.data, patient_id)
         else:
             # Single report mode
-            self.text_display.setPlainText(
-                f"=== Report {current_entry['Report-ID']} ({current_entry['Report-Date']}) ===\n\n"
-                f"{current_entry['Text']}"
-            )
             self.current_patient_reports = [current_entry]
+
+        # Use the prepared view if the prefetcher got here first
+        key = self.view_key(self.current_index)
+        self.current_view = self.prefetched.pop(key, None)
+        if self.prefetch_active():
+            if self.current_view is not None:
+                self.prefetch_hits += 1
+            else:
+                self.prefetch_misses += 1
+            self.prefetch_label.setText(f"Prefetch: {self.prefetch_hits} hits / {self.prefetch_misses} misses")
+
+        # Reports are rendered block by block as the viewer scrolls
+        self.text_display.set_reports(self.current_patient_reports, self.report_text)
         
         # Load annotations for current view
         self.load_annotations_for_current_view()
+        self.prefill_umls_candidates()
+        self.schedule_prefetch()
+
+    def view_key(self, index):
+        """Key of the view showing data[index]: its patient in group mode, else the row."""
+        if self.group_patient_reports:
+            return ("patient", self.data[index]["Patient-ID"])
+        return ("report", index)
+
+    def prefetch_active(self):
+        # Texts are already in memory unless loading lazily, so only prefetch when there is disk work
+        return self.prefetch_depth > 0 and (self.report_index is not None or self.prelink_index is not None)
+
+    def upcoming_views(self, count):
+        """(key, reports) for the next views next_entry(skip_annotated=True) would show.
+
+        Only the next count * PREFETCH_SCAN_FACTOR views are examined.
+        """
+        views = []
+        scan = count * PREFETCH_SCAN_FACTOR
+        if self.group_patient_reports:
+            patients = self.patient_index.patients
+            start = self.patient_index.position[self.data[self.current_index]["Patient-ID"]] + 1
+            for position in range(start, min(start + scan, len(patients))):
+                if len(views) >= count:
+                    break
+                patient_id = patients[position]
+                if self.patient_index.is_complete(self.current_annotator_name, patient_id):
+                    continue
+                index = self.patient_index.ranges[patient_id][0]
+                views.append((self.view_key(index), self.patient_index.reports(self.data, patient_id)))
+        else:
+            start = self.current_index + 1
+            for index in range(start, min(start + scan, len(self.data))):
+                if len(views) >= count:
+                    break
+                if self.annotation_store.has(self.current_annotator_name, self.data[index]["Report-ID"]):
+                    continue
+                views.append((self.view_key(index), [self.data[index]]))
+        return views
+
+    def schedule_prefetch(self):
+        """Queue the upcoming views that are not prepared yet."""
+        if not self.prefetch_active():
+            return
+        views = self.upcoming_views(self.prefetch_depth)
+        keys = {key for key, _ in views}
+        for key in list(self.prefetched):
+            if key not in keys:
+                del self.prefetched[key]
+
+        if self.prefetch_worker is None:
+            self.prefetch_worker = PrefetchWorker(self.prepare_view, self)
+            self.prefetch_worker.ready.connect(self.on_view_prefetched)
+            self.prefetch_worker.start()
+        self.prefetch_worker.submit(
+            self.prefetch_generation, [(key, reports) for key, reports in views if key not in self.prefetched])
+
+    def prepare_view(self, reports):
+        """Read what a view needs from disk; runs on the prefetch thread."""
+        report_index, prelink_index = self.report_index, self.prelink_index
+        texts, candidates = {}, {}
+        for report in reports:
+            report_id = report["Report-ID"]
+            if report_index is not None:
+                texts[report_id] = report_index.read_text(report)
+            if prelink_index is not None:
+                candidates[report_id] = prelink_index.get(report_id)
+        return {"texts": texts, "candidates": candidates}
+
+    def on_view_prefetched(self, generation, key, view):
+        if generation == self.prefetch_generation:
+            self.prefetched[key] = view
+
+    def prefill_umls_candidates(self):
+        """Fill empty mapper dropdowns with candidates linked ahead of time (umls.py prelink)."""
+        if self.prelink_index is None:
+            return
+
+        # Best score per concept over all reports in view
+        candidates = {}
+        for report in self.current_patient_reports:
+            if self.current_view is not None and report["Report-ID"] in self.current_view["candidates"]:
+                report_candidates = self.current_view["candidates"][report["Report-ID"]]
+            else:
+                report_candidates = self.prelink_index.get(report["Report-ID"])
+            for candidate in report_candidates:
+                cui = candidate['cui']
+                if cui not in candidates or candidate['score'] > candidates[cui]['score']:
+                    candidates[cui] = candidate
+        ranked = sorted(candidates.values(), key=lambda c: c['score'], reverse=True)
+
+        for control in self.controls.values():
+            if not isinstance(control, MapperControl) or not control.built or control.dropdown.count():
+                continue
+            semantic_types = control.semantic_types
+            for candidate in ranked:
+                if semantic_types and not set(semantic_types) & set(candidate['types']):
+                    continue
+                control.add_candidate(candidate)
+            if control.dropdown.count():
+                # Suggestions only: nothing is selected until the annotator picks one
+                control.dropdown.setCurrentIndex(-1)
+                control.match_checkbox.setEnabled(True)
 
     def load_annotations(self):
         """Load existing annotations for a report into the UI."""
-        self.all_annotations = []
-        if os.path.exists(self.output_path):
-            try:
-                with open(self.output_path, 'r') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and "annotations" in data:
-                        self.all_annotations = data["annotations"]
-                    elif isinstance(data, list):
-                        self.all_annotations = data
-            except Exception as e:
-                QMessageBox.warning(self, "Warning", f"Could not load annotations: {str(e)}")
+        self.annotation_store = AnnotationStore()
+        self.close_backend()
+        try:
+            self.backend = open_backend(self.storage_backend, self.output_path, journal_mode=self.journal_mode)
+            self.annotation_store = self.backend.load()
+            self.save_worker = SaveWorker(self.backend, self)
+            self.save_worker.saved.connect(self.on_save_written)
+            self.save_worker.failed.connect(self.on_save_failed)
+            self.save_worker.start()
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not load annotations: {str(e)}")
         
         # Initialize current report annotations
         self.current_report_annotations = {}
 
+    def close_backend(self):
+        """Write pending saves and close the storage backend."""
+        if self.save_worker is not None:
+            self.save_worker.stop()
+            self.save_worker = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def closeEvent(self, event):
+        if self.umls_worker is not None:
+            self.umls_worker.stop()
+            if not self.umls_worker.wait(2000):
+                self.umls_worker.terminate()  # Still loading the linker
+                self.umls_worker.wait()
+        if self.prefetch_worker is not None:
+            self.prefetch_worker.stop()
+        self.stop_search_index()
+        self.close_backend()
+        self.metrics.flush()
+        super().closeEvent(event)
+
+    def on_save_written(self, pending):
+        if pending:
+            self.save_status_label.setStyleSheet("color: #b58900;")
+            self.save_status_label.setText(f"Saving... ({pending} pending)")
+        else:
+            self.save_status_label.setStyleSheet("color: #4CAF50;")
+            self.save_status_label.setText("All changes saved")
+            if self.confirm_save:
+                self.confirm_save = False
+                self.show_save_confirmation()
+
+    def on_save_failed(self, error):
+        self.confirm_save = False
+        self.save_status_label.setStyleSheet("color: #d32f2f;")
+        self.save_status_label.setText("Save failed, will retry on next save")
+        self.show_save_error(error)
+
+    def show_save_error(self, error):
+        if not self.suppress_save_warnings:
+            msg = QMessageBox()
+            msg.setIcon(QMessageBox.Warning)
+            msg.setText(f"Failed to save: {error}")
+            msg.setWindowTitle("Error")
+            
+            cb = QCheckBox("Don't show this message again")
+            msg.setCheckBox(cb)
+            msg.exec_()
+            
+            if cb.isChecked():
+                self.suppress_save_warnings = True
+                self.save_settings()
+
     def load_annotation_values(self):
         """Load annotation values into UI controls."""
         if not self.current_patient_reports:
             return
         
-        # For single report mode
-        if not self.group_patient_reports:
-            report_id = self.current_patient_reports[0]["Report-ID"]
-            annotations = self.current_report_annotations.get(report_id, {})
-            
-            for label, control in self.controls.items():
-                if label in annotations:
-                    value = annotations[label]
-                    if isinstance(control, QSlider):
-                        control.setValue(value)
-                    elif isinstance(control, QButtonGroup):
-                        for button in control.buttons():
-                            if button.text() == value:
-                                button.setChecked(True)
-                                break
-                    elif isinstance(control, QCheckBox):
-                        control.setChecked(value)
-                    elif isinstance(control, dict) and 'text' in control:
-                        control['text'].setText(str(value.get("text", "")))
-                        # Handle UMLS dropdown
-                        ulms = value.get("umls_selection", {})
-                        concept_id = ulms.get("cui", "")
-                        canonical_name = ulms.get("canonical_name", "")
-                        score = ulms.get("score", "")
-                        types = ulms.get("types", [])
-
-                        display_text = f"{canonical_name} (Score: {score:.2f}, CUI: {concept_id})"
-                        control['dropdown'].addItem(display_text, {
-                            'cui': concept_id,
-                            'canonical_name': canonical_name,
-                            'score': score,
-                            'types': types
-                        })
-                        control['match_checkbox'].setChecked(value.get("match_checkbox", False))
-                    elif isinstance(control, QLineEdit):
-                        control.setText(str(value))
-                    elif isinstance(control, QDateEdit):
-                        control.setDate(QDate.fromString(value, "dd-MM-yyyy") if value else QDate(2000, 1, 1))
-                    elif isinstance(control, QComboBox):
-                        control.setCurrentText(str(value))
-        
-        # For group mode
-        else:
-            first_report_id = self.current_patient_reports[0]["Report-ID"]
-            annotations = self.current_report_annotations.get(first_report_id, {})
-            
-            for label, control in self.controls.items():
-                if label in annotations:
-                    value = annotations[label]
-                    if isinstance(control, QSlider):
-                        control.setValue(value)
-                    elif isinstance(control, QButtonGroup):
-                        for button in control.buttons():
-                            if button.text() == value:
-                                button.setChecked(True)
-                                break
-                    elif isinstance(control, QCheckBox):
-                        control.setChecked(value)
-                    elif isinstance(control, dict) and 'text' in control:
-                        control['text'].setText(str(value.get("text", "")))
-                        # Handle UMLS dropdown
-                        ulms = value.get("umls_selection", {})
-                        concept_id = ulms.get("cui", "")
-                        canonical_name = ulms.get("canonical_name", "")
-                        score = ulms.get("score", "")
-                        types = ulms.get("types", [])
-
-                        display_text = f"{canonical_name} (Score: {score:.2f}, CUI: {concept_id})"
-                        control['dropdown'].addItem(display_text, {
-                            'cui': concept_id,
-                            'canonical_name': canonical_name,
-                            'score': score,
-                            'types': types
-                        })
-                        control['match_checkbox'].setChecked(value.get("match_checkbox", False))
-                    elif isinstance(control, QLineEdit):
-                        control.setText(str(value))
-                    elif isinstance(control, QDateEdit):
-                        control.setDate(QDate.fromString(value, "dd-MM-yyyy"))
-                    elif isinstance(control, QComboBox):
-                        control.setCurrentText(str(value))
+        # Group mode stores the same values on every report, so the first one is enough
+        report_id = self.current_patient_reports[0]["Report-ID"]
+        annotations = self.current_report_annotations.get(report_id, {})
+        
+        for label, control in self.controls.items():
+            if label in annotations:
+                control.set(annotations[label])
 
     def save_and_next(self):
         """Save current annotations and move to next unannotated entry."""
@@ -1088,21 +1668,25 @@ class AnnotationApp(QMainWindow):
         self.current_report_annotations = self.collect_annotation_data()
 
         if self.save_annotations():
+            # Confirmed once the save worker has written it, see on_save_written
+            self.confirm_save = True
             self.next_entry(skip_annotated=True)
-            if not self.suppress_save_warnings:
-                msg = QMessageBox()
-                msg.setIcon(QMessageBox.Information)
-                msg.setText("Annotations saved successfully!")
-                msg.setWindowTitle("Saved")
-                
-                # Add checkbox to suppress future warnings
-                cb = QCheckBox("Don't show this message again")
-                msg.setCheckBox(cb)
-                msg.exec_()
-                
-                if cb.isChecked():
-                    self.suppress_save_warnings = True
-                    self.save_settings()
+
+    def show_save_confirmation(self):
+        if not self.suppress_save_warnings:
+            msg = QMessageBox()
+            msg.setIcon(QMessageBox.Information)
+            msg.setText("Annotations saved successfully!")
+            msg.setWindowTitle("Saved")
+            
+            # Add checkbox to suppress future warnings
+            cb = QCheckBox("Don't show this message again")
+            msg.setCheckBox(cb)
+            msg.exec_()
+            
+            if cb.isChecked():
+                self.suppress_save_warnings = True
+                self.save_settings()
     
     def next_entry(self, skip_annotated=False):
         """Move to next report or patient group."""
@@ -1111,24 +1695,18 @@ class AnnotationApp(QMainWindow):
             
         if self.group_patient_reports:
             # Find next unannotated patient group
+            patients = self.patient_index.patients
             current_patient = self.data[self.current_index]["Patient-ID"]
-            for i in range(self.current_index + 1, len(self.data)):
-                if self.data[i]["Patient-ID"] != current_patient:
-                    # Check if we should skip fully annotated patients
-                    if skip_annotated:
-                        patient_reports = [r for r in self.data if r["Patient-ID"] == self.data[i]["Patient-ID"]]
-                        all_annotated = all(
-                            any(a["report_id"] == r["Report-ID"] for a in self.all_annotations 
-                                if a["annotator"] == self.current_annotator_name)
-                            for r in patient_reports
-                        )
-                        if all_annotated:
-                            continue
-                    
-                    self.current_index = i
-                    self.clear_controls()
-                    self.update_ui()
-                    return
+            for position in range(self.patient_index.position[current_patient] + 1, len(patients)):
+                patient_id = patients[position]
+                # Check if we should skip fully annotated patients
+                if skip_annotated and self.patient_index.is_complete(self.current_annotator_name, patient_id):
+                    continue
+                
+                self.current_index = self.patient_index.ranges[patient_id][0]
+                self.clear_controls()
+                self.update_ui()
+                return
         else:
             # Original single report behavior
             start_index = self.current_index
@@ -1138,10 +1716,8 @@ class AnnotationApp(QMainWindow):
                     break
                     
                 self.current_index += 1
-                if not skip_annotated or not any(
-                    a["report_id"] == self.data[self.current_index]["Report-ID"] 
-                    for a in self.all_annotations 
-                    if a["annotator"] == self.current_annotator_name
+                if not skip_annotated or not self.annotation_store.has(
+                    self.current_annotator_name, self.data[self.current_index]["Report-ID"]
                 ):
                     self.clear_controls()
                     self.update_ui()
@@ -1159,12 +1735,11 @@ class AnnotationApp(QMainWindow):
         if self.group_patient_reports:
             # Find previous patient group
             current_patient = self.data[self.current_index]["Patient-ID"]
-            for i in range(self.current_index - 1, -1, -1):
-                if self.data[i]["Patient-ID"] != current_patient:
-                    self.current_index = i
-                    self.clear_controls()
-                    self.update_ui()
-                    return
+            position = self.patient_index.position[current_patient]
+            if position > 0:
+                self.current_index = self.patient_index.ranges[self.patient_index.patients[position - 1]][0]
+                self.clear_controls()
+                self.update_ui()
         else:
             # Original single report behavior
             self.current_index -= 1
@@ -1173,87 +1748,17 @@ class AnnotationApp(QMainWindow):
     
     def validate_annotations(self):
         """Check if all required fields are filled"""
-        for control in self.required_controls:
-            if isinstance(control, QSlider):
-                if control.value() == control.minimum():  # Assuming default is min
-                    return False
-            elif isinstance(control, QButtonGroup):
-                if not control.checkedButton():
-                    return False
-            elif isinstance(control, QCheckBox):
-                if not control.isChecked():
-                    return False
-            elif isinstance(control, dict) and 'text' in control:
-                if not control['text'].text().strip():
-                    return False
-                if not control['dropdown'].currentData():
-                    return False
-                if not control['match_checkbox'].isChecked():
-                    return False
-            elif isinstance(control, QLineEdit):  # Text field validation
-                if not control.text().strip():
-                    return False
-            elif isinstance(control, QDateEdit):  # Date field validation
-                if not control.date().isValid():
-                    return False
-            elif isinstance(control, QComboBox):  # Dropdown validation
-                if not control.currentText():
-                    return False
-        return True
+        return all(control.is_valid() for control in self.controls.values() if control.required)
         
     def collect_annotation_data(self):
         """Gather all control values for current reports."""
         collected_data = {}
+        current_annotations = {label: control.get() for label, control in self.controls.items()}
         
         if not self.group_patient_reports:
-            # Single report mode - same as before
-            report_id = self.current_patient_reports[0]["Report-ID"]
-            report_data = {}
-            for label, control in self.controls.items():
-                if isinstance(control, QSlider):
-                    report_data[label] = control.value()
-                elif isinstance(control, QButtonGroup):
-                    checked = control.checkedButton()
-                    report_data[label] = checked.text() if checked else None
-                elif isinstance(control, QCheckBox):
-                    report_data[label] = control.isChecked()
-                elif isinstance(control, dict) and 'text' in control:
-                    report_data[label] = {
-                        'text': control['text'].text(),
-                        'umls_selection': control['dropdown'].currentData() if control['dropdown'].currentIndex() >= 0 else None,
-                        'match_checkbox': control['match_checkbox'].isChecked()
-                    }
-                elif isinstance(control, QLineEdit):
-                    report_data[label] = control.text()
-                elif isinstance(control, QDateEdit):
-                    report_data[label] = control.date().toString("dd-MM-yyyy") if not control.date().toString("dd-MM-yyyy") == "01-01-2000" else None
-                elif isinstance(control, QComboBox):
-                    report_data[label] = control.currentText()
-            collected_data[report_id] = report_data
+            # Single report mode
+            collected_data[self.current_patient_reports[0]["Report-ID"]] = current_annotations
         else:
-            # Group mode - collect current control values
-            current_annotations = {}
-            for label, control in self.controls.items():
-                if isinstance(control, QSlider):
-                    current_annotations[label] = control.value()
-                elif isinstance(control, QButtonGroup):
-                    checked = control.checkedButton()
-                    current_annotations[label] = checked.text() if checked else None
-                elif isinstance(control, QCheckBox):
-                    current_annotations[label] = control.isChecked()
-                elif isinstance(control, dict) and 'text' in control:
-                    current_annotations[label] = {
-                        'text': control['text'].text(),
-                        'umls_selection': control['dropdown'].currentData() if control['dropdown'].currentIndex() >= 0 else None,
-                        'match_checkbox': control['match_checkbox'].isChecked()
-                    }
-                elif isinstance(control, QLineEdit):
-                    current_annotations[label] = control.text()
-                elif isinstance(control, QDateEdit):
-                    current_annotations[label] = control.date().toString("dd-MM-yyyy") if not control.date().toString("dd-MM-yyyy") == "01-01-2000" else None
-                elif isinstance(control, QComboBox):
-                    current_annotations[label] = control.currentText()
-            
             # Create combined report ID string for display
             report_ids = [r["Report-ID"] for r in self.current_patient_reports]
             combined_id = " - ".join(report_ids)
@@ -1269,66 +1774,20 @@ class AnnotationApp(QMainWindow):
 
     def clear_controls(self):
         """Reset all input controls to default values"""
-        for label, control in self.controls.items():
-            if isinstance(control, QSlider):
-                control.setValue(control.minimum())
-            elif isinstance(control, QButtonGroup):
-                control.setExclusive(False)
-                for button in control.buttons():
-                    button.setChecked(False)
-                control.setExclusive(True)
-            elif isinstance(control, QCheckBox):
-                control.setChecked(False)
-            elif isinstance(control, dict) and 'text' in control:
-                # Reset to default if specified in YAML, else empty
-                default = next((item.get("default", "") for item in self.find_control_config(label) if "default" in item), "")
-                control['text'].setText(default)
-                control['dropdown'].clear()
-                control['match_checkbox'].setChecked(False)
-            elif isinstance(control, QLineEdit):  # Text field
-                # Reset to default if specified in YAML, else empty
-                default = next((item.get("default", "") for item in self.find_control_config(label) if "default" in item), "")
-                control.setText(default)
-            elif isinstance(control, QDateEdit):  # Date field
-                control.setDate(QDate(2000, 1, 1))# Reset to 01-01-2000
-            elif isinstance(control, QComboBox):  # Dropdown
-                # Reset to default if specified in YAML, else first item
-                config = next((item for item in self.find_control_config(label)), {})
-                if "default" in config and config["default"] in [control.itemText(i) for i in range(control.count())]:
-                    control.setCurrentText(config["default"])
-                else:
-                    control.setCurrentIndex(0)
-
-    def find_control_config(self, label):
-        """Helper to find control config by label"""
-        def search_items(items):
-            for item in items:
-                if "controls" in item:
-                    for control in item["controls"]:
-                        if control.get("label") == label:
-                            yield control
-                elif "groups" in item:
-                    yield from search_items(item["groups"])
-        
-        return list(search_items(self.task_config["groups"]))
+        for control in self.controls.values():
+            control.reset()
 
     def save_annotations(self):
         """Save annotations for current view."""
         try:
             new_annotations = self.collect_annotation_data()
-            report_ids = list(new_annotations.keys())
+            saved_records = []
+            reports_in_view = {r["Report-ID"]: r for r in self.current_patient_reports}
             
-            # Remove existing annotations for these reports
-            updated_annotations = [
-                a for a in self.all_annotations
-                if not (a["report_id"] in report_ids and 
-                    a["annotator"] == self.current_annotator_name)
-            ]
-            
-            # Add new annotations
+            # Add new annotations, replacing existing ones for these reports
             for report_id, annotation_data in new_annotations.items():
                 if annotation_data:
-                    report = next((r for r in self.data if r["Report-ID"] == report_id), None)
+                    report = reports_in_view.get(report_id)
                     if report:
                         # Create the annotation object
                         annotation_obj = {
@@ -1346,37 +1805,80 @@ class AnnotationApp(QMainWindow):
                             if "_grouped_reports" in annotation_obj["annotation"]:
                                 del annotation_obj["annotation"]["_grouped_reports"]
                         
-                        updated_annotations.append(annotation_obj)
+                        is_new = not self.annotation_store.has(self.current_annotator_name, report_id)
+                        self.annotation_store.add(annotation_obj)
+                        saved_records.append(annotation_obj)
+                        if is_new:
+                            self.patient_index.mark_annotated(self.current_annotator_name, report_id)
             
-            self.all_annotations = updated_annotations
-            
-            with open(self.output_path, 'w') as f:
-                json.dump({
-                    "annotations": self.all_annotations,
-                    "timestamp": datetime.datetime.now().isoformat()
-                }, f, indent=2)
+            # Written to disk by the save worker so navigation doesn't wait on I/O. Only the
+            # JSON backend writes the full state; SQLite upserts the saved records alone.
+            all_records = self.annotation_store.to_list() if self.backend.name == "json" else None
+            self.save_worker.submit(saved_records, all_records)
+            self.save_status_label.setStyleSheet("color: #b58900;")
+            self.save_status_label.setText(f"Saving... ({self.save_worker.pending()} pending)")
             
             self.update_progress()
             return True
         except Exception as e:
-            if not self.suppress_save_warnings:
-                msg = QMessageBox()
-                msg.setIcon(QMessageBox.Warning)
-                msg.setText(f"Failed to save: {str(e)}")
-                msg.setWindowTitle("Error")
-                
-                cb = QCheckBox("Don't show this message again")
-                msg.setCheckBox(cb)
-                msg.exec_()
-                
-                if cb.isChecked():
-                    self.suppress_save_warnings = True
-                    self.save_settings()
+            self.show_save_error(str(e))
             return False
     
+    def import_annotations(self):
+        """Merge annotations from another JSON or SQLite file into the current storage."""
+        if self.backend is None:
+            QMessageBox.warning(self, "Warning", "Open a project before importing annotations")
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import Annotations", "", "Annotation Files (*.json *.sqlite *.db)")
+        if not file_path:
+            return  # User cancelled
+
+        try:
+            source = open_backend(backend_for_path(file_path), file_path)
+            try:
+                records = source.load().to_list()
+            finally:
+                source.close()
+
+            for record in records:
+                self.annotation_store.add(record)
+            self.save_worker.submit(records, self.annotation_store.to_list())
+            if self.patient_index is not None:
+                self.patient_index.reset_counts()
+
+            self.update_progress()
+            self.update_ui()
+            QMessageBox.information(self, "Success", f"Imported {len(records)} annotations from {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to import annotations: {str(e)}")
+
+    def export_annotations(self):
+        """Copy all annotations to a JSON or SQLite file."""
+        if not self.annotation_store:
+            QMessageBox.warning(self, "Warning", "No annotations to export")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Annotations", "", "JSON Files (*.json);;SQLite Databases (*.sqlite)")
+        if not file_path:
+            return  # User cancelled
+
+        try:
+            records = self.annotation_store.to_list()
+            target = open_backend(backend_for_path(file_path), file_path)
+            try:
+                target.save(records, records)
+            finally:
+                target.close()
+            QMessageBox.information(self, "Success", f"Exported {len(records)} annotations to {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export annotations: {str(e)}")
+
     def save_annotations_to_csv(self):
         """Save all annotations to a CSV file."""
-        if not self.all_annotations:
+        if not self.annotation_store:
             QMessageBox.warning(self, "Warning", "No annotations to save")
             return
 
@@ -1397,43 +1899,31 @@ class AnnotationApp(QMainWindow):
             if not file_path.endswith('.csv'):
                 file_path += '.csv'
                 
-            # Collect all unique field names from annotations
-            fieldnames = set()
-            for annotation in self.all_annotations:
-                fieldnames.update(annotation["annotation"].keys())
-            
-            # Standard fields we always include
-            standard_fields = [
-                "annotator",
-                "patient_id",
-                "report_id",
-                "timestamp",
-                "combined_report_ids"
-            ]
-            
-            # Combine and order fields
-            all_fields = standard_fields + sorted(f for f in fieldnames if f not in standard_fields)
-
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=all_fields)
-                writer.writeheader()
-                
-                for annotation in self.all_annotations:
-                    row = {
-                        "annotator": annotation["annotator"],
-                        "patient_id": annotation["patient_id"],
-                        "report_id": annotation["report_id"],
-                        "timestamp": annotation["timestamp"],
-                        "combined_report_ids": annotation.get("combined_report_ids", "")
-                    }
-                    # Add all annotation fields
-                    row.update(annotation["annotation"])
-                    writer.writerow(row)
+            # Columns come from the task, so one streaming pass is enough
+            export_csv(file_path, self.annotation_store, self.task_config)
 
             QMessageBox.information(self, "Success", f"Annotations saved to {file_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save CSV: {str(e)}")
 
+    def save_annotations_to_parquet(self):
+        """Save all annotations, typed and joined with their report dates, to a Parquet file."""
+        if not self.annotation_store:
+            QMessageBox.warning(self, "Warning", "No annotations to save")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Annotations as Parquet", "", "Parquet Files (*.parquet)")
+        if not file_path:
+            return  # User cancelled
+
+        try:
+            if not file_path.endswith('.parquet'):
+                file_path += '.parquet'
+            export_parquet(file_path, self.annotation_store, self.task_config, reports=self.data)
+            QMessageBox.information(self, "Success", f"Annotations saved to {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save Parquet: {str(e)}")
+
     def load_annotations_for_current_view(self):
         """Load annotations for all reports in current view."""
         self.current_report_annotations = {}
@@ -1445,14 +1935,10 @@ class AnnotationApp(QMainWindow):
             report_id = report["Report-ID"]
             
             # Find most recent annotation for this report+annotator
-            matching_annotations = [
-                a for a in self.all_annotations 
-                if a["report_id"] == report_id and 
-                a["annotator"] == self.current_annotator_name
-            ]
+            annotation = self.annotation_store.get(self.current_annotator_name, report_id)
             
-            if matching_annotations:
-                self.current_report_annotations[report_id] = matching_annotations[-1]["annotation"]
+            if annotation:
+                self.current_report_annotations[report_id] = annotation["annotation"]
             else:
                 # Initialize empty annotation
                 self.current_report_annotations[report_id] = {}
@@ -1467,12 +1953,10 @@ class AnnotationApp(QMainWindow):
             return
             
         # Find most recent annotation for this report+annotator
-        matching_annotations = [a for a in self.all_annotations 
-                            if a["report_id"] == report_id and 
-                                a["annotator"] == self.current_annotator_name]
+        annotation = self.annotation_store.get(self.current_annotator_name, report_id)
         
-        if matching_annotations:
-            self.current_report_annotations = matching_annotations[-1]["annotation"]
+        if annotation:
+            self.current_report_annotations = annotation["annotation"]
 
     def apply_styles(self):
         """Apply QSS styling for a modern look."""
@@ -1547,12 +2031,26 @@ if __name__ == "__main__":
     parser.add_argument('--csv', help='Path to CSV file')
     parser.add_argument('--yaml', help='Path to YAML task file')
     parser.add_argument('--output', help='Path to output JSON file')
+    parser.add_argument('--journal', action='store_true', help='Append saves to a JSONL journal next to the output file')
+    parser.add_argument('--lazy', action='store_true', help='Index the CSV and read report texts from disk on demand')
+    parser.add_argument('--umls-server', default=f'{DEFAULT_HOST}:{DEFAULT_PORT}',
+                        help='host:port of a shared UMLS linking server (python umls.py serve); '
+                             'the linker is loaded in-process when none is running')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), help='Annotation storage backend (default: guessed from --output extension)')
+    parser.add_argument('--prefetch', type=int, default=3, help='Number of upcoming reports/patients to prepare in the background (0 disables)')
+    parser.add_argument('--profile-startup', action='store_true', help='Print how long each startup phase took')
+    parser.add_argument('--metrics', action='store_true', help='Time loading, saving and navigation (Help -> Performance, annotator_metrics.jsonl)')
     args = parser.parse_args()
     
     app = QApplication(sys.argv)
     
     # Create application window with or without command line arguments
-    window = AnnotationApp(csv_path=args.csv, yaml_path=args.yaml, output_path=args.output)
+    window = AnnotationApp(
+        csv_path=args.csv, yaml_path=args.yaml, output_path=args.output,
+        journal_mode=args.journal, storage_backend=args.backend, lazy_loading=args.lazy,
+        umls_server=parse_address(args.umls_server), prefetch_depth=args.prefetch,
+        defer_loading=True, profile_startup=args.profile_startup, metrics_enabled=args.metrics
+    )
     
     # Center the window on screen
     qt_rectangle = window.frameGeometry()
@@ -0,0 +1,249 @@
+"""Time the data path of the app at growing numbers of reports.
+
+    python benchmarks/data_layer.py --sizes 1000 10000 100000 --output results.json
+    python benchmarks/data_layer.py --sizes 1000 10000 --baseline results.json
+
+For every size a synthetic CSV and annotation files (JSON and SQLite) are
+generated, then each operation is run --repeat times. The operations are
+the library calls the corresponding AnnotationApp methods make, without
+Qt, so this also runs on build machines without a display:
+
+    load_data               load_reports (or LazyReportIndex) + PatientIndex
+    load_annotations        backend.load()
+    save_annotations        AnnotationStore.add + backend.save, per save (what SaveWorker writes)
+    find_first_unannotated  the scan for the first report without an annotation
+    update_progress         AnnotationStore.count / PatientIndex.completed_count (cold)
+    save_annotations_to_csv export_csv
+
+Results are written as JSON. With --baseline, operations whose median got
+more than --tolerance slower than in the baseline are listed and the exit
+status is 1.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import datetime
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import export_csv
+from reports import LazyReportIndex, PatientIndex, load_reports
+from storage import open_backend
+from tasks import read_task_config
+from synthetic import iter_annotation_records, write_annotations, write_reports_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Saves timed per run of a save_annotations benchmark
+SAVES = 20
+
+# Differences below this many seconds are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.001
+
+
+def time_call(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+class DataLayerBenchmark:
+    """Generates the files for one size and times every operation on them."""
+
+    def __init__(self, workdir, rows, task_config, reports_per_patient, text_length, annotators, coverage):
+        self.workdir = workdir
+        self.rows = rows
+        self.task_config = task_config
+        self.reports_per_patient = reports_per_patient
+        self.csv_path = os.path.join(workdir, f"reports_{rows}.csv")
+        self.json_path = os.path.join(workdir, f"annotations_{rows}.json")
+        self.sqlite_path = os.path.join(workdir, f"annotations_{rows}.sqlite")
+
+        write_reports_csv(self.csv_path, rows, reports_per_patient, text_length)
+        for path in (self.json_path, self.sqlite_path):
+            write_annotations(path, iter_annotation_records(rows, task_config, annotators, coverage, reports_per_patient))
+
+        backend = open_backend("json", self.json_path)
+        self.store = backend.load()
+        backend.close()
+        self.data, _ = load_reports(self.csv_path)
+        self.annotator = "annotator1"
+
+    def operations(self):
+        """(name, function) per operation; function() returns the seconds one run took."""
+        return [
+            ("load_data", lambda: time_call(self.load_data)),
+            ("load_data[lazy]", self.load_data_lazy),
+            ("load_data[lazy, cached]", lambda: time_call(self.load_data_lazy_cached)),
+            ("load_annotations[json]", lambda: time_call(lambda: self.load_annotations("json", self.json_path))),
+            ("load_annotations[sqlite]", lambda: time_call(lambda: self.load_annotations("sqlite", self.sqlite_path))),
+            ("save_annotations[json]", lambda: self.save_annotations("json", self.json_path)),
+            ("save_annotations[json, journal]", lambda: self.save_annotations("json", self.json_path, journal_mode=True)),
+            ("save_annotations[sqlite]", lambda: self.save_annotations("sqlite", self.sqlite_path)),
+            ("find_first_unannotated", lambda: time_call(self.find_first_unannotated)),
+            ("update_progress[single]", lambda: time_call(self.update_progress_single)),
+            ("update_progress[group]", self.update_progress_group),
+            ("save_annotations_to_csv", lambda: time_call(self.save_annotations_to_csv)),
+        ]
+
+    def load_data(self):
+        data, _ = load_reports(self.csv_path)
+        PatientIndex(data, self.store)
+
+    def load_data_lazy(self):
+        index_path = f"{self.csv_path}.index.json"
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        return time_call(self.load_data_lazy_cached)
+
+    def load_data_lazy_cached(self):
+        index = LazyReportIndex(self.csv_path)
+        PatientIndex(index.load(), self.store)
+        index.close()
+
+    def load_annotations(self, backend_name, path):
+        backend = open_backend(backend_name, path)
+        backend.load()
+        backend.close()
+
+    def save_annotations(self, backend_name, path, journal_mode=False):
+        # Save into a copy so every run starts from the same file
+        copy = os.path.join(self.workdir, "save" + os.path.splitext(path)[1])
+        shutil.copy(path, copy)
+        backend = open_backend(backend_name, copy, journal_mode=journal_mode)
+        store = backend.load()
+        records = list(iter_annotation_records(SAVES, self.task_config, annotators=1, coverage=1,
+                                               reports_per_patient=self.reports_per_patient, seed=1))
+        seconds = []
+        for record in records:
+            record["annotator"] = "benchmark"
+            start = time.perf_counter()
+            store.add(record)
+            backend.save([record], store.to_list())
+            seconds.append(time.perf_counter() - start)
+        backend.close()
+        for leftover in (copy, os.path.splitext(copy)[0] + ".journal.jsonl", f"{copy}-wal", f"{copy}-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        return statistics.median(seconds)
+
+    def find_first_unannotated(self):
+        for i, entry in enumerate(self.data):
+            if not self.store.has(self.annotator, entry["Report-ID"]):
+                return i
+        return len(self.data) - 1
+
+    def update_progress_single(self):
+        return self.store.count(self.annotator), len(self.data)
+
+    def update_progress_group(self):
+        # The first call per annotator counts from the store; later ones are cached
+        patient_index = PatientIndex(self.data, self.store)
+        start = time.perf_counter()
+        patient_index.completed_count(self.annotator)
+        return time.perf_counter() - start
+
+    def save_annotations_to_csv(self):
+        export_csv(os.path.join(self.workdir, "export.csv"), self.store, self.task_config)
+
+
+def run(sizes, task_config, repeat, reports_per_patient, text_length, annotators, coverage, workdir):
+    results = []
+    for rows in sizes:
+        print(f"{rows} reports: generating data", file=sys.stderr)
+        benchmark = DataLayerBenchmark(workdir, rows, task_config, reports_per_patient, text_length, annotators, coverage)
+        for name, function in benchmark.operations():
+            runs = [function() for _ in range(repeat)]
+            results.append({
+                "operation": name,
+                "rows": rows,
+                "annotations": len(benchmark.store),
+                "runs": runs,
+                "median": statistics.median(runs),
+                "min": min(runs),
+            })
+            print(f"  {name:<32} {results[-1]['median'] * 1000:10.2f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Results whose median is more than tolerance (a fraction) slower than the same entry in baseline."""
+    previous = {(result["operation"], result["rows"]): result["median"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["operation"], result["rows"]))
+        if before is None:
+            continue
+        if result["median"] > before * (1 + tolerance) and result["median"] - before > MIN_REGRESSION_SECONDS:
+            regressions.append((result, before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the report and annotation data path')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of reports to benchmark')
+    parser.add_argument('--yaml', default=os.path.join(ROOT, 'configs', 'pathology.yaml'), help='YAML task for the annotations')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per operation; the median is reported')
+    parser.add_argument('--reports-per-patient', type=int, default=5)
+    parser.add_argument('--text-length', type=int, default=2000, help='Characters of text per report')
+    parser.add_argument('--annotators', type=int, default=2)
+    parser.add_argument('--coverage', type=float, default=0.5, help='Share of reports every annotator has labelled')
+    parser.add_argument('--workdir', help='Directory for the generated files (default: a temporary directory)')
+    parser.add_argument('--output', help='Write the results as JSON to this file (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    task_config = read_task_config(args.yaml)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="annotator-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        results = run(args.sizes, task_config, args.repeat, args.reports_per_patient, args.text_length,
+                      args.annotators, args.coverage, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "benchmark": "data_layer",
+        "created": datetime.datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parameters": {
+            "yaml": os.path.relpath(args.yaml, ROOT),
+            "repeat": args.repeat,
+            "reports_per_patient": args.reports_per_patient,
+            "text_length": args.text_length,
+            "annotators": args.annotators,
+            "coverage": args.coverage,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for result, before in regressions:
+            print(f"Regression: {result['operation']} at {result['rows']} reports took "
+                  f"{result['median'] * 1000:.2f} ms (baseline {before * 1000:.2f} ms)", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
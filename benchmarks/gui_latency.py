@@ -0,0 +1,246 @@
+"""Latency of Next, Prev and Save in the real window, under Qt's offscreen platform.
+
+    python benchmarks/gui_latency.py --rows 20000 --samples 200 --output latency.json
+    python benchmarks/gui_latency.py --budget next=50 --budget save=150 --budget group.next=120
+
+For every task (--yaml, default configs/pathology.yaml and
+configs/colorectal.yaml) an AnnotationApp is opened on a synthetic CSV, with
+annotations from other annotators already in the output file. Each
+interaction is a button click followed by processing the events it posted
+(repaints included), in single report mode and in patient group mode. Save
+fills in every control first, outside the timing.
+
+Results (p50/p95/p99/max in seconds) are written as JSON. A budget is
+INTERACTION=MS or MODE.INTERACTION=MS and applies to --budget-percentile
+(default p95); the exit status is 1 if any budget is exceeded.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import datetime
+import tempfile
+import statistics
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from tasks import read_task_config
+from synthetic import iter_annotation_records, random_value, write_annotations, write_reports_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TASKS = [os.path.join(ROOT, "configs", "pathology.yaml"), os.path.join(ROOT, "configs", "colorectal.yaml")]
+
+MODES = ("single", "group")
+INTERACTIONS = ("next", "prev", "save")
+PERCENTILES = (50, 95, 99)
+
+# Clicks before measuring, so first-use costs (lazy imports, caches) are not counted
+WARMUP = 5
+
+
+def quiet_message_boxes():
+    """Modal boxes would block the run, so they return immediately."""
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
+    QMessageBox.warning = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
+    QMessageBox.critical = staticmethod(lambda *args, **kwargs: print("Error:", *args[2:], file=sys.stderr))
+    QMessageBox.exec_ = lambda self: QMessageBox.Ok
+
+
+def summarize(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    summary = {f"p{percentile}": cuts[percentile - 1] for percentile in PERCENTILES}
+    summary.update(samples=len(samples), mean=statistics.mean(samples), max=max(samples))
+    return summary
+
+
+class LatencyBenchmark:
+    """Drives one AnnotationApp window and times its buttons."""
+
+    def __init__(self, qt_app, window, seed=0):
+        self.qt_app = qt_app
+        self.window = window
+        self.rng = random.Random(seed)
+
+    def click(self, button):
+        start = time.perf_counter()
+        button.click()
+        self.qt_app.processEvents()
+        return time.perf_counter() - start
+
+    def fill_controls(self):
+        for control in self.window.controls.values():
+            control.set(random_value(self.rng, control.config))
+
+    def set_mode(self, mode):
+        window = self.window
+        window.group_patient_reports = mode == "group"
+        window.current_index = 0
+        window.clear_controls()
+        window.update_ui()
+        window.update_progress()
+        self.qt_app.processEvents()
+
+    def measure(self, mode, samples):
+        """{interaction: [seconds, ...]} for one mode."""
+        self.set_mode(mode)
+        window = self.window
+        for _ in range(WARMUP):
+            self.click(window.next_button)
+
+        latencies = {interaction: [] for interaction in INTERACTIONS}
+        for _ in range(samples):
+            latencies["next"].append(self.click(window.next_button))
+        for _ in range(samples):
+            latencies["prev"].append(self.click(window.prev_button))
+        for _ in range(samples):
+            self.fill_controls()
+            latencies["save"].append(self.click(window.save_button))
+        return latencies
+
+
+def run_task(qt_app, yaml_path, args, workdir):
+    import app as app_module  # After QT_QPA_PLATFORM is set
+
+    task_config = read_task_config(yaml_path)
+    name = os.path.splitext(os.path.basename(yaml_path))[0]
+    csv_path = os.path.join(workdir, f"reports_{args.rows}.csv")
+    if not os.path.exists(csv_path):
+        write_reports_csv(csv_path, args.rows, args.reports_per_patient, args.text_length)
+    output_path = os.path.join(workdir, f"{name}_annotations.{args.backend}")
+    write_annotations(output_path, iter_annotation_records(
+        args.rows, task_config, args.annotators, args.coverage, args.reports_per_patient))
+
+    window = app_module.AnnotationApp(
+        csv_path=csv_path, yaml_path=yaml_path, output_path=output_path, storage_backend=args.backend,
+        lazy_loading=args.lazy, prefetch_depth=args.prefetch)
+    window.current_annotator_name = "benchmark"
+    window.suppress_save_warnings = True
+    window.show()
+    qt_app.processEvents()
+
+    results = []
+    benchmark = LatencyBenchmark(qt_app, window)
+    try:
+        for mode in MODES:
+            for interaction, samples in benchmark.measure(mode, args.samples).items():
+                result = {"task": os.path.relpath(yaml_path, ROOT), "mode": mode, "interaction": interaction}
+                result.update(summarize(samples))
+                results.append(result)
+                print(f"  {name:<12} {mode:<7} {interaction:<5} "
+                      + "  ".join(f"p{p} {result[f'p{p}'] * 1000:8.2f} ms" for p in PERCENTILES), file=sys.stderr)
+    finally:
+        window.close()
+        window.deleteLater()
+        qt_app.processEvents()
+    return results
+
+
+def parse_budgets(specs):
+    """{(mode or None, interaction): seconds} from INTERACTION=MS / MODE.INTERACTION=MS strings."""
+    budgets = {}
+    for spec in specs:
+        try:
+            key, milliseconds = spec.split("=")
+            mode, _, interaction = key.rpartition(".")
+            budgets[(mode or None, interaction)] = float(milliseconds) / 1000
+        except ValueError:
+            raise ValueError(f"Invalid budget '{spec}', expected INTERACTION=MS or MODE.INTERACTION=MS")
+        if interaction not in INTERACTIONS or (mode and mode not in MODES):
+            raise ValueError(f"Unknown budget '{key}': interactions are {', '.join(INTERACTIONS)}, modes {', '.join(MODES)}")
+    return budgets
+
+
+def over_budget(results, budgets, percentile):
+    """(result, budget) for results whose percentile is above their budget; MODE.INTERACTION wins over INTERACTION."""
+    exceeded = []
+    for result in results:
+        budget = budgets.get((result["mode"], result["interaction"]), budgets.get((None, result["interaction"])))
+        if budget is not None and result[f"p{percentile}"] > budget:
+            exceeded.append((result, budget))
+    return exceeded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Next/Prev/Save latency of the annotation window')
+    parser.add_argument('--yaml', nargs='+', default=DEFAULT_TASKS, help='YAML task files to benchmark')
+    parser.add_argument('--rows', type=int, default=20000, help='Reports in the synthetic CSV')
+    parser.add_argument('--samples', type=int, default=100, help='Clicks measured per interaction and mode')
+    parser.add_argument('--reports-per-patient', type=int, default=5)
+    parser.add_argument('--text-length', type=int, default=2000, help='Characters of text per report')
+    parser.add_argument('--annotators', type=int, default=2, help='Other annotators with saved annotations')
+    parser.add_argument('--coverage', type=float, default=0.5, help='Share of reports the other annotators labelled')
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json', help='Annotation storage backend')
+    parser.add_argument('--lazy', action='store_true', help='Read report texts from disk on demand')
+    parser.add_argument('--prefetch', type=int, default=3, help='Upcoming views to prepare in the background')
+    parser.add_argument('--budget', action='append', default=[], help='Latency budget, e.g. save=150 or group.next=100 (ms)')
+    parser.add_argument('--budget-percentile', type=int, choices=PERCENTILES, default=95)
+    parser.add_argument('--workdir', help='Directory for the generated files (default: a temporary directory)')
+    parser.add_argument('--output', help='Write the results as JSON to this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+    needed = (WARMUP + 2 * args.samples + 1) * args.reports_per_patient
+    if args.rows < needed:
+        parser.error(f"--rows must be at least {needed} for {args.samples} samples in group mode")
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    quiet_message_boxes()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="annotator-latency-")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        for yaml_path in args.yaml:
+            print(f"{yaml_path}: {args.rows} reports", file=sys.stderr)
+            results.extend(run_task(qt_app, yaml_path, args, workdir))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "benchmark": "gui_latency",
+        "created": datetime.datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qt_platform": qt_app.platformName(),
+        },
+        "parameters": {
+            "rows": args.rows,
+            "samples": args.samples,
+            "reports_per_patient": args.reports_per_patient,
+            "text_length": args.text_length,
+            "annotators": args.annotators,
+            "coverage": args.coverage,
+            "backend": args.backend,
+            "lazy": args.lazy,
+            "prefetch": args.prefetch,
+        },
+        "budgets": {f"{mode + '.' if mode else ''}{interaction}": seconds for (mode, interaction), seconds in budgets.items()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    exceeded = over_budget(results, budgets, args.budget_percentile)
+    for result, budget in exceeded:
+        print(f"Over budget: {result['task']} {result['mode']} {result['interaction']} "
+              f"p{args.budget_percentile} {result[f'p{args.budget_percentile}'] * 1000:.2f} ms "
+              f"(budget {budget * 1000:.0f} ms)", file=sys.stderr)
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
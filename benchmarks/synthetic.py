@@ -0,0 +1,173 @@
+"""Synthetic report CSVs and annotation files for benchmarking.
+
+    python benchmarks/synthetic.py reports.csv annotations.json --rows 100000 --yaml configs/pathology.yaml
+
+Reports are written sorted by patient and date, the order the app shows
+them in. Every annotator labels the same first `coverage` share of that
+order (annotators work front to back), with values drawn from the task's
+controls around a shared per-report answer so agreement is realistic.
+"""
+import os
+import sys
+import csv
+import random
+import datetime
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import DEFAULT_HEADERS
+from storage import backend_for_path, open_backend, write_annotation_file
+from tasks import is_mapper, iter_controls, read_task_config
+
+WORDS = (
+    "patient presents with lesion tumor biopsy resection margin specimen tissue cells "
+    "malignant benign grade invasion necrosis mitotic nuclear atypia stroma fibrosis "
+    "inflammation lymph node metastasis carcinoma sarcoma adenoma polyp mucosa colon "
+    "rectum liver lung history follow-up imaging contrast enhancement mass cm mm left right"
+).split()
+
+CONCEPTS = [
+    ("C0006826", "Malignant Neoplasms"),
+    ("C1261473", "Sarcoma"),
+    ("C0007097", "Carcinoma"),
+    ("C0001430", "Adenoma"),
+    ("C0027627", "Neoplasm Metastasis"),
+]
+
+# Chance that an annotator departs from the shared answer for a field
+DISAGREEMENT = 0.2
+
+# Share of mapper selections the annotator confirmed (Match? ticked)
+CONFIRMED = 0.9
+
+BATCH_SIZE = 10000
+
+
+def report_text(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def write_reports_csv(path, rows, reports_per_patient=5, text_length=2000, seed=0):
+    """Write rows reports, reports_per_patient per patient, each text_length characters of text."""
+    rng = random.Random(seed)
+    start = datetime.date(2015, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([DEFAULT_HEADERS[key] for key in ('patient_id', 'report_id', 'report_date', 'text')])
+        for i in range(rows):
+            patient = i // reports_per_patient
+            date = start + datetime.timedelta(days=patient % 2000 + (i % reports_per_patient) * 30)
+            writer.writerow([f"P{patient:07d}", f"R{i:08d}", date.isoformat(), report_text(rng, text_length)])
+
+
+def report_keys(rows, reports_per_patient=5):
+    """(patient_id, report_id) of every report write_reports_csv wrote, in file order."""
+    for i in range(rows):
+        yield f"P{i // reports_per_patient:07d}", f"R{i:08d}"
+
+
+def random_value(rng, control):
+    """A plausible saved value for a control."""
+    kind = control["type"]
+    if is_mapper(control):
+        cui, name = rng.choice(CONCEPTS)
+        return {
+            "text": name.lower(),
+            "umls_selection": {"cui": cui, "canonical_name": name, "score": round(rng.uniform(0.7, 1.0), 3)},
+            "match_checkbox": rng.random() < CONFIRMED,
+        }
+    if kind in ("radio", "dropdown"):
+        return rng.choice(control["options"])
+    if kind == "autocomplete":
+        return rng.choice(control.get("options") or [""])
+    if kind == "checkbox":
+        return rng.random() < 0.5
+    if kind == "slider":
+        return rng.randint(control["min"], control["max"])
+    if kind == "date":
+        return (datetime.date(2015, 1, 1) + datetime.timedelta(days=rng.randrange(3650))).strftime("%d-%m-%Y")
+    return report_text(rng, rng.randint(1, 40)).strip()
+
+
+def iter_annotation_records(rows, task_config, annotators=2, coverage=0.5, reports_per_patient=5, seed=0):
+    """Yield annotation records for the first coverage share of rows reports, per annotator."""
+    controls = list(iter_controls(task_config["groups"]))
+    names = [f"annotator{i + 1}" for i in range(annotators)]
+    rng = random.Random(seed)
+    timestamp = datetime.datetime(2024, 1, 1)
+    annotated = int(rows * coverage)
+    for n, (patient_id, report_id) in enumerate(report_keys(annotated, reports_per_patient)):
+        # One value per control, not per label: a label can appear in several groups
+        shared = [random_value(rng, control) for control in controls]
+        for name in names:
+            annotation = {
+                control["label"]: random_value(rng, control) if rng.random() < DISAGREEMENT else value
+                for value, control in zip(shared, controls)
+            }
+            yield {
+                "annotator": name,
+                "patient_id": patient_id,
+                "report_id": report_id,
+                "timestamp": (timestamp + datetime.timedelta(seconds=n)).isoformat(),
+                "annotation": annotation,
+            }
+
+
+def write_annotations(path, records, backend=None):
+    """Write records to a JSON or SQLite annotation file (replacing it); returns the count."""
+    backend = backend or backend_for_path(path)
+    if os.path.exists(path):
+        os.remove(path)
+    if backend == "json":
+        records = list(records)
+        write_annotation_file(path, records)
+        return len(records)
+
+    target = open_backend(backend, path)
+    count = 0
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= BATCH_SIZE:
+                target.save(batch)
+                count += len(batch)
+                batch = []
+        target.save(batch)
+        return count + len(batch)
+    finally:
+        target.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic reports and annotations')
+    parser.add_argument('csv', help='Report CSV to write')
+    parser.add_argument('annotations', nargs='?', help='Annotation file to write (.json or .sqlite)')
+    parser.add_argument('--yaml', default='assets/example.yaml', help='YAML task the annotations follow')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--reports-per-patient', type=int, default=5)
+    parser.add_argument('--text-length', type=int, default=2000, help='Characters of text per report')
+    parser.add_argument('--annotators', type=int, default=2)
+    parser.add_argument('--coverage', type=float, default=0.5, help='Share of reports every annotator has labelled')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    write_reports_csv(args.csv, args.rows, args.reports_per_patient, args.text_length, args.seed)
+    print(f"Wrote {args.rows} reports to {args.csv}")
+    if args.annotations:
+        records = iter_annotation_records(
+            args.rows, read_task_config(args.yaml), args.annotators, args.coverage, args.reports_per_patient, args.seed)
+        count = write_annotations(args.annotations, records)
+        print(f"Wrote {count} annotations to {args.annotations}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
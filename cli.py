@@ -0,0 +1,232 @@
+"""Batch operations on annotation files, without starting the GUI.
+
+    python cli.py export annotations.json annotations.csv --yaml task.yaml
+    python cli.py validate annotations.json --yaml task.yaml --csv reports.csv
+    python cli.py merge combined.sqlite alice.json bob.json
+    python cli.py stats annotations.json --yaml task.yaml
+    python cli.py agreement annotations.json --yaml task.yaml
+
+The same commands work as `python app.py <command> ...` (and in the packaged
+app). Nothing here imports PyQt5, and annotation files are streamed, so
+this runs on machines without a display and on very large projects.
+"""
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+
+from export import annotation_fieldnames, export_csv, export_parquet, write_annotations_csv
+from reports import DEFAULT_HEADERS, LazyReportIndex, iter_report_texts
+from storage import BACKENDS, backend_for_path, copy_annotations, iter_annotations
+from tasks import iter_controls, read_task_config, validate_annotation
+
+COMMANDS = ("export", "validate", "merge", "stats", "agreement")
+
+
+def read_records(args):
+    if not os.path.exists(args.annotations):
+        raise ValueError(f"Annotation file not found: {args.annotations}")
+    return iter_annotations(args.annotations, args.backend)
+
+
+def export_command(args):
+    target = args.output
+    if os.path.exists(target) and os.path.exists(args.annotations) and os.path.samefile(target, args.annotations):
+        raise ValueError(f"Export target is the annotation file itself: {target}")
+    file_format = args.format or os.path.splitext(target)[1].lstrip(".").lower()
+    if file_format == "parquet":
+        if not args.yaml:
+            raise ValueError("Parquet export needs the task file (--yaml) for its column types")
+        reports = None
+        if args.csv:
+            # Only the report index is needed for the join, not the texts
+            headers = dict(DEFAULT_HEADERS, report_id=args.report_id_column, text=args.text_column)
+            index = LazyReportIndex(args.csv, headers)
+            reports = index.load()
+            index.close()
+        count = export_parquet(target, read_records(args), read_task_config(args.yaml), reports=reports)
+    elif file_format == "csv" and args.yaml:
+        count = export_csv(target, read_records(args), read_task_config(args.yaml))
+    elif file_format == "csv":
+        # Without a task, scan once for the columns, then write
+        fieldnames = annotation_fieldnames(read_records(args))
+        count = write_annotations_csv(target, read_records(args), fieldnames)
+    else:
+        target_backend = "json" if file_format == "json" else backend_for_path(target)
+        # An export replaces the file instead of merging into it; files left by an earlier
+        # one (a JSON journal, SQLite WAL) would otherwise be replayed on top of it
+        if target_backend == "json":
+            leftovers = [target, os.path.splitext(target)[0] + ".journal.jsonl"]
+        else:
+            leftovers = [target, f"{target}-wal", f"{target}-shm", f"{target}-journal"]
+        for leftover in leftovers:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        count = copy_annotations(args.annotations, target, source_backend=args.backend, target_backend=target_backend)
+    print(f"Exported {count} annotations to {target}")
+    return 0
+
+
+def validate_command(args):
+    controls = {}
+    if args.yaml:
+        controls = {control["label"]: control for control in iter_controls(read_task_config(args.yaml)["groups"])}
+    report_ids = None
+    if args.csv:
+        headers = dict(DEFAULT_HEADERS, report_id=args.report_id_column, text=args.text_column)
+        report_ids = {report_id for report_id, _ in iter_report_texts(args.csv, headers)}
+
+    checked = invalid = 0
+    for record in read_records(args):
+        checked += 1
+        problems = []
+        for field in ("annotator", "report_id", "annotation"):
+            if field not in record:
+                problems.append(f"missing '{field}'")
+        if not problems:
+            if controls:
+                problems.extend(validate_annotation(record["annotation"], controls))
+            if report_ids is not None and record["report_id"] not in report_ids:
+                problems.append("report is not in the CSV")
+        if problems:
+            invalid += 1
+            for problem in problems:
+                print(f"{record.get('annotator')}/{record.get('report_id')}: {problem}")
+
+    print(f"Checked {checked} annotations: {invalid} with problems")
+    return 1 if invalid else 0
+
+
+def merge_command(args):
+    # Check every input before anything is written
+    for source in args.inputs:
+        if not os.path.exists(source):
+            raise ValueError(f"Annotation file not found: {source}")
+        if os.path.exists(args.output) and os.path.samefile(source, args.output):
+            raise ValueError(f"Merge input is the output file itself: {source}")
+    for source in args.inputs:
+        count = copy_annotations(source, args.output, target_backend=args.backend)
+        print(f"Merged {count} annotations from {source}")
+    return 0
+
+
+def stats_command(args):
+    categorical = {}
+    if args.yaml:
+        categorical = {
+            control["label"]: Counter()
+            for control in iter_controls(read_task_config(args.yaml)["groups"])
+            if control["type"] in ("radio", "dropdown", "checkbox")
+        }
+
+    records = 0
+    grouped = 0
+    per_annotator = Counter()
+    reports = set()
+    patients = set()
+    for record in read_records(args):
+        records += 1
+        per_annotator[record["annotator"]] += 1
+        reports.add(record["report_id"])
+        patients.add(record.get("patient_id"))
+        if record.get("combined_report_ids"):
+            grouped += 1
+        for label, counts in categorical.items():
+            if label in record["annotation"]:
+                counts[record["annotation"][label]] += 1
+
+    print(f"Annotations: {records} ({grouped} from grouped patient views)")
+    print(f"Reports: {len(reports)}")
+    print(f"Patients: {len(patients)}")
+    print("Per annotator:")
+    for annotator, count in per_annotator.most_common():
+        print(f"  {annotator}: {count}")
+
+    if args.csv:
+        headers = dict(DEFAULT_HEADERS, report_id=args.report_id_column, text=args.text_column)
+        total = sum(1 for _ in iter_report_texts(args.csv, headers))
+        print(f"Coverage: {len(reports)} of {total} reports annotated")
+
+    for label, counts in categorical.items():
+        print(f"{label}:")
+        for value, count in counts.most_common():
+            print(f"  {value}: {count}")
+    return 0
+
+
+def agreement_command(args):
+    from agreement import compute_agreement, format_agreement  # Needs NumPy, the other commands do not
+
+    results = compute_agreement(read_records(args), read_task_config(args.yaml))
+    if args.json:
+        # NaN (undefined statistic) is written as null
+        for result in results:
+            for key, value in result.items():
+                if isinstance(value, float) and value != value:
+                    result[key] = None
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_agreement(results))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch operations on Patient Report Annotator files')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_source(subparser):
+        subparser.add_argument('annotations', help='Annotation file (JSON or SQLite)')
+        subparser.add_argument('--backend', choices=sorted(BACKENDS), help='Storage backend (default: guessed from the extension)')
+
+    def add_csv(subparser):
+        subparser.add_argument('--csv', help='Report CSV file')
+        subparser.add_argument('--report-id-column', default=DEFAULT_HEADERS['report_id'])
+        subparser.add_argument('--text-column', default=DEFAULT_HEADERS['text'])
+
+    export_parser = subparsers.add_parser('export', help='Write annotations to CSV, JSON or SQLite')
+    add_source(export_parser)
+    export_parser.add_argument('output', help='Output file')
+    export_parser.add_argument('--format', choices=['csv', 'json', 'sqlite', 'parquet'], help='Output format (default: from the extension)')
+    export_parser.add_argument('--yaml', help='YAML task file; CSV columns follow its controls and UMLS mapper fields are split into '
+                                              '<label>.text/.cui/.canonical_name/.score')
+    add_csv(export_parser)
+
+    validate_parser = subparsers.add_parser('validate', help='Check annotations against the task and reports')
+    add_source(validate_parser)
+    validate_parser.add_argument('--yaml', help='YAML task file to check values against')
+    add_csv(validate_parser)
+
+    merge_parser = subparsers.add_parser('merge', help='Merge annotation files; later files win per annotator/report')
+    merge_parser.add_argument('output', help='Annotation file to merge into (created if needed)')
+    merge_parser.add_argument('inputs', nargs='+', help='Annotation files to merge')
+    merge_parser.add_argument('--backend', choices=sorted(BACKENDS), help='Output storage backend (default: guessed from the extension)')
+
+    stats_parser = subparsers.add_parser('stats', help='Summarize annotation progress')
+    add_source(stats_parser)
+    stats_parser.add_argument('--yaml', help='YAML task file; adds value counts for radio, dropdown and checkbox fields')
+    add_csv(stats_parser)
+
+    agreement_parser = subparsers.add_parser('agreement', help='Inter-annotator agreement per field')
+    add_source(agreement_parser)
+    agreement_parser.add_argument('--yaml', required=True, help='YAML task file; radio, dropdown, checkbox, slider and confirmed UMLS mapper fields are compared')
+    agreement_parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    args = parser.parse_args(argv)
+
+    commands = {
+        'export': export_command,
+        'validate': validate_command,
+        'merge': merge_command,
+        'stats': stats_command,
+        'agreement': agreement_command,
+    }
+    try:
+        return commands[args.command](args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
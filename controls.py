@@ -0,0 +1,335 @@
+from PyQt5.QtWidgets import (
+    QHBoxLayout, QSlider, QRadioButton, QCheckBox, QButtonGroup,
+    QLineEdit, QComboBox, QDateEdit, QCompleter, QPushButton
+)
+from PyQt5.QtCore import Qt, QDate, QTimer
+
+# Control classes by YAML "type"; see register_control
+CONTROL_TYPES = {}
+
+
+def register_control(type_name):
+    """Class decorator adding a ControlAdapter subclass for a YAML control type."""
+    def decorator(cls):
+        CONTROL_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+def create_control(config):
+    """Return the adapter for a YAML control config."""
+    if config["type"] == "text" and config.get("mapper", False):
+        return MapperControl(config)
+    if config["type"] not in CONTROL_TYPES:
+        raise ValueError(f"Unknown control type '{config['type']}' for '{config.get('label')}'")
+    return CONTROL_TYPES[config["type"]](config)
+
+
+class ControlAdapter:
+    """One YAML control: builds its widgets and reads, writes, resets and validates them.
+
+    Until build() is called (e.g. inside a collapsed group that was never
+    opened) the value lives in self.value and get/set/reset/is_valid use that.
+    Subclasses implement create_widgets, read, write, empty_value and check.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.label = config["label"]
+        self.required = config.get("required", False)
+        self.default = config.get("default")
+        self.built = False
+        self.value = self.empty_value()
+
+    def build(self, parent_layout, app):
+        self.create_widgets(parent_layout, app)
+        self.built = True
+        self.write(self.value)
+
+    def get(self):
+        """Current value as stored in the annotation file."""
+        return self.read() if self.built else self.value
+
+    def set(self, value):
+        """Show a value loaded from the annotation file."""
+        if self.built:
+            self.write(value)
+        else:
+            self.value = value
+
+    def reset(self):
+        if self.built:
+            self.clear()
+        else:
+            self.value = self.empty_value()
+
+    def is_valid(self):
+        """Whether a required control has been filled in."""
+        return self.check(self.get())
+
+    def clear(self):
+        self.write(self.empty_value())
+
+    def empty_value(self):
+        return None
+
+    def check(self, value):
+        return True
+
+    def create_widgets(self, parent_layout, app):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def write(self, value):
+        raise NotImplementedError
+
+
+@register_control("slider")
+class SliderControl(ControlAdapter):
+    def create_widgets(self, parent_layout, app):
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(self.config["min"], self.config["max"])
+        parent_layout.addWidget(self.slider)
+
+    def read(self):
+        return self.slider.value()
+
+    def write(self, value):
+        self.slider.setValue(value)
+
+    def empty_value(self):
+        return self.config["min"]  # Set default to min
+
+    def check(self, value):
+        return value != self.config["min"]  # Assuming default is min
+
+
+@register_control("radio")
+class RadioControl(ControlAdapter):
+    def create_widgets(self, parent_layout, app):
+        self.group = QButtonGroup()
+        self.buttons = {}
+        for option in self.config["options"]:
+            radio = QRadioButton(option)
+            parent_layout.addWidget(radio)
+            self.group.addButton(radio)
+            self.buttons[option] = radio
+
+    def read(self):
+        checked = self.group.checkedButton()
+        return checked.text() if checked else None
+
+    def write(self, value):
+        if value in self.buttons:
+            self.buttons[value].setChecked(True)
+
+    def clear(self):
+        self.group.setExclusive(False)
+        for button in self.buttons.values():
+            button.setChecked(False)
+        self.group.setExclusive(True)
+
+    def check(self, value):
+        return value is not None
+
+
+@register_control("checkbox")
+class CheckboxControl(ControlAdapter):
+    def create_widgets(self, parent_layout, app):
+        self.checkbox = QCheckBox(self.label)
+        parent_layout.addWidget(self.checkbox)
+
+    def read(self):
+        return self.checkbox.isChecked()
+
+    def write(self, value):
+        self.checkbox.setChecked(value)
+
+    def empty_value(self):
+        return False
+
+    def check(self, value):
+        return bool(value)
+
+
+@register_control("text")
+class TextControl(ControlAdapter):
+    placeholder = ""
+
+    def create_widgets(self, parent_layout, app):
+        self.text_field = QLineEdit()
+        self.text_field.setPlaceholderText(self.config.get("placeholder", self.placeholder))
+        parent_layout.addWidget(self.text_field)
+
+    def read(self):
+        return self.text_field.text()
+
+    def write(self, value):
+        self.text_field.setText(str(value))
+
+    def empty_value(self):
+        # Default if specified in YAML, else empty
+        return self.config.get("default", "")
+
+    def check(self, value):
+        return bool(str(value).strip())
+
+
+@register_control("autocomplete")
+class AutocompleteControl(TextControl):
+    placeholder = "Start typing..."
+
+    def create_widgets(self, parent_layout, app):
+        super().create_widgets(parent_layout, app)
+
+        # Create completer with options
+        completer = QCompleter(self.config["options"])
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)  # Match anywhere in string
+        completer.setCompletionMode(QCompleter.PopupCompletion)
+        self.text_field.setCompleter(completer)
+
+
+@register_control("date")
+class DateControl(ControlAdapter):
+    EMPTY_DATE = QDate(2000, 1, 1)  # Shown when no date is set, saved as None
+
+    def create_widgets(self, parent_layout, app):
+        self.date_field = QDateEdit()
+        self.date_field.setDisplayFormat("dd-MM-yyyy")
+        self.date_field.setCalendarPopup(True)
+        parent_layout.addWidget(self.date_field)
+
+    def read(self):
+        if self.date_field.date() == self.EMPTY_DATE:
+            return None
+        return self.date_field.date().toString("dd-MM-yyyy")
+
+    def write(self, value):
+        self.date_field.setDate(QDate.fromString(value, "dd-MM-yyyy") if value else self.EMPTY_DATE)
+
+    def check(self, value):
+        # The empty date is a valid date too, as it always has been
+        return value is None or QDate.fromString(value, "dd-MM-yyyy").isValid()
+
+
+@register_control("dropdown")
+class DropdownControl(ControlAdapter):
+    def create_widgets(self, parent_layout, app):
+        self.combo = QComboBox()
+        self.combo.addItems(self.config["options"])
+        parent_layout.addWidget(self.combo)
+
+    def read(self):
+        return self.combo.currentText()
+
+    def write(self, value):
+        self.combo.setCurrentText(str(value))
+
+    def empty_value(self):
+        # Default if specified in YAML, else first item
+        options = self.config["options"]
+        if self.default in options:
+            return self.default
+        return options[0] if options else ""
+
+    def check(self, value):
+        return bool(value)
+
+
+class MapperControl(ControlAdapter):
+    """Free text linked to a UMLS concept: text field, search button, results dropdown and confirmation."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.semantic_types = config.get("semantic_types")
+        # Required mapper fields are not enforced; UMLS linking is optional
+        self.required = False
+
+    def create_widgets(self, parent_layout, app):
+        # Create mapper control layout
+        mapper_layout = QHBoxLayout()
+
+        # Text field
+        self.text_field = QLineEdit()
+        self.text_field.setPlaceholderText(self.config.get("placeholder", ""))
+        mapper_layout.addWidget(self.text_field, stretch=2)
+
+        # Update button
+        self.update_button = QPushButton("🔍")
+        self.update_button.setToolTip("Search UMLS")
+        self.update_button.setFixedWidth(30)
+        mapper_layout.addWidget(self.update_button)
+
+        # Dropdown for UMLS results
+        self.dropdown = QComboBox()
+        self.dropdown.setFixedWidth(250)
+        mapper_layout.addWidget(self.dropdown, stretch=1)
+
+        # Checkbox for match confirmation
+        self.match_checkbox = QCheckBox("Match?")
+        self.match_checkbox.setEnabled(False)
+        mapper_layout.addWidget(self.match_checkbox)
+
+        self.cancel_search = app.cancel_umls_search
+
+        # Connect signals
+        self.update_button.clicked.connect(
+            lambda _: app.search_umls(self.text_field.text(), self.dropdown, self.match_checkbox))
+
+        # Editing the text makes a running search stale
+        self.text_field.textEdited.connect(lambda _: app.cancel_umls_search(self.dropdown))
+
+        if self.config.get("search_as_you_type", False):
+            # Search once typing pauses
+            search_timer = QTimer(self.text_field)
+            search_timer.setSingleShot(True)
+            search_timer.setInterval(self.config.get("search_delay_ms", 500))
+            search_timer.timeout.connect(
+                lambda: app.search_umls(self.text_field.text(), self.dropdown, self.match_checkbox))
+            self.text_field.textEdited.connect(lambda _: search_timer.start())
+
+        parent_layout.addLayout(mapper_layout)
+
+    def read(self):
+        return {
+            'text': self.text_field.text(),
+            'umls_selection': self.dropdown.currentData() if self.dropdown.currentIndex() >= 0 else None,
+            'match_checkbox': self.match_checkbox.isChecked()
+        }
+
+    def write(self, value):
+        self.text_field.setText(str(value.get("text", "")))
+        # Handle UMLS dropdown
+        selection = value.get("umls_selection")
+        if selection:
+            self.add_candidate(selection)
+        self.match_checkbox.setChecked(value.get("match_checkbox", False))
+
+    def add_candidate(self, candidate):
+        score = candidate.get("score", 0.0)
+        display_text = f"{candidate.get('canonical_name', '')} (Score: {score:.2f}, CUI: {candidate.get('cui', '')})"
+        self.dropdown.addItem(display_text, {
+            'cui': candidate.get("cui", ""),
+            'canonical_name': candidate.get("canonical_name", ""),
+            'score': score,
+            'types': candidate.get("types", [])
+        })
+
+    def clear(self):
+        self.cancel_search(self.dropdown)
+        self.dropdown.clear()
+        self.write(self.empty_value())
+
+    def empty_value(self):
+        # Default text if specified in YAML, else empty
+        return {'text': self.config.get("default", ""), 'umls_selection': None, 'match_checkbox': False}
+
+    def check(self, value):
+        return (
+            bool(value.get("text", "").strip())
+            and bool(value.get("umls_selection"))
+            and bool(value.get("match_checkbox"))
+        )
@@ -0,0 +1,215 @@
+import csv
+import datetime
+
+from tasks import is_mapper, iter_controls
+
+# Record fields written before the annotation fields
+STANDARD_FIELDS = [
+    "annotator",
+    "patient_id",
+    "report_id",
+    "timestamp",
+    "combined_report_ids"
+]
+
+# Columns a UMLS mapper value is flattened into, as "<label>.<part>"
+MAPPER_PARTS = ["text", "cui", "canonical_name", "score"]
+
+
+def annotation_fieldnames(records):
+    """CSV columns for records: the standard fields, then every annotation field seen, sorted."""
+    fieldnames = set()
+    for record in records:
+        fieldnames.update(record["annotation"].keys())
+    return STANDARD_FIELDS + sorted(f for f in fieldnames if f not in STANDARD_FIELDS)
+
+
+def task_fieldnames(task_config):
+    """CSV columns for a YAML task, in the order the controls appear; mappers get one column per part."""
+    fieldnames = list(STANDARD_FIELDS)
+    for control in iter_controls(task_config["groups"]):
+        if is_mapper(control):
+            columns = [f"{control['label']}.{part}" for part in MAPPER_PARTS]
+        else:
+            columns = [control["label"]]
+        fieldnames.extend(column for column in columns if column not in fieldnames)
+    return fieldnames
+
+
+def mapper_labels(task_config):
+    return {control["label"] for control in iter_controls(task_config["groups"]) if is_mapper(control)}
+
+
+def flatten_mapper(label, value):
+    """Split a mapper value ({text, umls_selection, ...}) into "<label>.<part>" columns."""
+    value = value if isinstance(value, dict) else {}
+    selection = value.get("umls_selection") or {}
+    return {
+        f"{label}.text": value.get("text", ""),
+        f"{label}.cui": selection.get("cui", ""),
+        f"{label}.canonical_name": selection.get("canonical_name", ""),
+        f"{label}.score": selection.get("score", ""),
+    }
+
+
+def write_annotations_csv(path, records, fieldnames, mappers=()):
+    """Write records as CSV rows one at a time; returns the number written.
+
+    Values of labels in mappers are flattened with flatten_mapper. Fields
+    that have no column (e.g. controls removed from the task) are left out.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+
+        for record in records:
+            writer.writerow(record_row(record, mappers))
+            count += 1
+    return count
+
+
+def record_row(record, mappers=()):
+    """One flat row for a record: the standard fields plus its annotation fields."""
+    row = {
+        "annotator": record["annotator"],
+        "patient_id": record["patient_id"],
+        "report_id": record["report_id"],
+        "timestamp": record["timestamp"],
+        "combined_report_ids": record.get("combined_report_ids", "")
+    }
+    # Add all annotation fields
+    for label, value in record["annotation"].items():
+        if label in mappers:
+            row.update(flatten_mapper(label, value))
+        else:
+            row[label] = value
+    return row
+
+
+def export_csv(path, records, task_config):
+    """Single pass CSV export with the columns of a YAML task."""
+    return write_annotations_csv(path, records, task_fieldnames(task_config), mapper_labels(task_config))
+
+
+PARQUET_ROW_GROUP_SIZE = 50000
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _to_int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _to_bool(value):
+    return value if isinstance(value, bool) else None
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _to_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%d-%m-%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_timestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parquet_columns(task_config):
+    """(name, arrow type, converter) per Parquet column, typed by the YAML control types."""
+    pa = import_pyarrow()
+    columns = [
+        ("annotator", pa.string(), _to_str),
+        ("patient_id", pa.string(), _to_str),
+        ("report_id", pa.string(), _to_str),
+        ("report_date", pa.timestamp("us"), _to_timestamp),
+        ("timestamp", pa.timestamp("us"), _to_timestamp),
+        ("combined_report_ids", pa.string(), _to_str),
+    ]
+    types = {
+        "slider": (pa.int64(), _to_int),
+        "checkbox": (pa.bool_(), _to_bool),
+        "date": (pa.date32(), _to_date),
+    }
+    seen = {name for name, _, _ in columns}
+    for control in iter_controls(task_config["groups"]):
+        label = control["label"]
+        if is_mapper(control):
+            parts = [
+                (f"{label}.text", pa.string(), _to_str),
+                (f"{label}.cui", pa.string(), _to_str),
+                (f"{label}.canonical_name", pa.string(), _to_str),
+                (f"{label}.score", pa.float64(), _to_float),
+            ]
+        else:
+            parts = [(label, *types.get(control["type"], (pa.string(), _to_str)))]
+        for column in parts:
+            if column[0] not in seen:
+                seen.add(column[0])
+                columns.append(column)
+    return columns
+
+
+def export_parquet(path, records, task_config, reports=None, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Write records to Parquet, typed by the YAML task and joined with report metadata.
+
+    reports are rows from load_data (or a LazyReportIndex); they are hashed
+    by report ID once, which adds each record's report date and fills in a
+    missing patient ID. Rows are written in row groups of row_group_size, so
+    memory stays bounded however many records there are.
+    """
+    pa = import_pyarrow()
+    columns = parquet_columns(task_config)
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns])
+    mappers = mapper_labels(task_config)
+    reports_by_id = {report["Report-ID"]: report for report in reports or []}
+
+    batch = {name: [] for name, _, _ in columns}
+    count = 0
+
+    def write_batch():
+        writer.write_table(pa.table(batch, schema=schema), row_group_size=row_group_size)
+        for values in batch.values():
+            values.clear()
+
+    writer = pa.parquet.ParquetWriter(path, schema)
+    try:
+        for record in records:
+            row = record_row(record, mappers)
+            report = reports_by_id.get(record["report_id"])
+            if report is not None:
+                # Unparseable dates are parsed as datetime.min (to sort first); export them as null
+                parsed_date = report["_parsed_date"]
+                row["report_date"] = None if parsed_date == datetime.datetime.min else parsed_date
+                row["patient_id"] = row["patient_id"] or report["Patient-ID"]
+            for name, _, convert in columns:
+                batch[name].append(convert(row.get(name)))
+            count += 1
+            if count % row_group_size == 0:
+                write_batch()
+        if count % row_group_size or not count:
+            write_batch()
+    finally:
+        writer.close()
+    return count
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import datetime
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+class PhaseTimer:
+    """Wall-clock time of named phases, in the order they ran."""
+
+    def __init__(self):
+        self.phases = []  # (name, seconds)
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def report(self, title="Startup timing"):
+        """Human readable breakdown, one phase per line."""
+        width = max([len(name) for name, _ in self.phases] + [len("total")])
+        lines = [f"{title}:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total':<{width}}  {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+# Upper bucket bounds of the rolling histograms, in milliseconds
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+METRICS_MAX_BYTES = 1024 * 1024
+METRICS_BACKUPS = 3
+
+
+class RollingHistogram:
+    """Durations of the last window calls of one operation."""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)  # seconds
+        self.count = 0  # All calls, also those that fell out of the window
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def buckets(self):
+        """Call count per HISTOGRAM_BOUNDS_MS bucket, plus one for anything slower."""
+        counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for seconds in self.samples:
+            counts[bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+        return counts
+
+    def summary(self):
+        """count, mean, p50/p95/p99 and max (milliseconds) over the window."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count}
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+        return {
+            "count": self.count,
+            "mean": sum(ordered) / len(ordered) * 1000,
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": ordered[-1] * 1000,
+        }
+
+
+class Metrics:
+    """Opt-in timing of named operations: rolling histograms plus a rotating JSONL log.
+
+    Methods are timed by wrapping them on the instance with instrument(),
+    which does nothing when disabled, so a disabled Metrics costs nothing on
+    the hot path. Timings can come from any thread; flush() appends those
+    not yet logged to log_path, rotating it at METRICS_MAX_BYTES.
+    """
+
+    def __init__(self, enabled=False, window=1000):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}  # name -> RollingHistogram
+        self.pending = []  # (wall time, name, seconds) not yet written to the log
+        self.log_path = None
+        self._lock = threading.Lock()
+
+    def instrument(self, obj, name, label=None):
+        """Replace obj.name by a wrapper that records how long every call takes."""
+        if not self.enabled:
+            return
+        method = getattr(obj, name)
+        label = label or name
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(label, time.perf_counter() - start)
+
+        setattr(obj, name, timed)
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = RollingHistogram(self.window)
+            self.histograms[name].add(seconds)
+            self.pending.append((time.time(), name, seconds))
+
+    def flush(self):
+        """Append pending timings to log_path as JSON lines."""
+        with self._lock:
+            pending, self.pending = self.pending, []
+        if not pending or not self.log_path:
+            return
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= METRICS_MAX_BYTES:
+                rotate_file(self.log_path, METRICS_BACKUPS)
+            with open(self.log_path, 'a') as f:
+                for wall_time, name, seconds in pending:
+                    f.write(json.dumps({
+                        "time": datetime.datetime.fromtimestamp(wall_time).isoformat(),
+                        "name": name,
+                        "ms": round(seconds * 1000, 3),
+                    }) + "\n")
+        except OSError as e:
+            print(f"Failed to write metrics: {str(e)}")
+
+    def report(self):
+        """Human readable summary and histogram per operation."""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+        if not histograms:
+            return "No timings recorded yet."
+
+        labels = [f"<{bound} ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">={HISTOGRAM_BOUNDS_MS[-1]} ms"]
+        lines = []
+        for name, histogram in histograms:
+            summary = histogram.summary()
+            lines.append(
+                f"{name}: {summary['count']} calls | last {len(histogram.samples)}: "
+                f"mean {summary['mean']:.1f} ms, p50 {summary['p50']:.1f}, p95 {summary['p95']:.1f}, "
+                f"p99 {summary['p99']:.1f}, max {summary['max']:.1f}"
+            )
+            counts = histogram.buckets()
+            largest = max(counts)
+            for label, count in zip(labels, counts):
+                if count:
+                    lines.append(f"  {label:>10} {'#' * max(1, 40 * count // largest):<40} {count}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+def rotate_file(path, backups):
+    """Shift path to path.1, path.1 to path.2 and so on, keeping backups old files."""
+    for number in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{number}"):
+            os.replace(f"{path}.{number}", f"{path}.{number + 1}")
+    os.replace(path, f"{path}.1")
@@ -0,0 +1,415 @@
+import os
+import csv
+import json
+import datetime
+import threading
+
+DEFAULT_HEADERS = {
+    'patient_id': 'Patient-ID',
+    'report_id': 'Report-ID',
+    'report_date': 'Report-Date',
+    'text': 'Text'
+}
+
+
+def check_columns(fieldnames, headers):
+    """Raise ValueError if the CSV header lacks any of the configured columns."""
+    required_columns = {
+        headers['patient_id'],
+        headers['report_id'],
+        headers['report_date'],
+        headers['text']
+    }
+
+    if not fieldnames or not required_columns.issubset(fieldnames):
+        raise ValueError(
+            f"CSV must include columns matching: {', '.join(required_columns)}. "
+            f"Found columns: {', '.join(fieldnames or [])}"
+        )
+
+
+# Formats tried when inferring a file's date format. Month-first comes before
+# day-first so ambiguous dates are read the same way dateutil reads them.
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d",
+    "%Y%m%d",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%d.%m.%Y",
+    "%m-%d-%Y %H:%M",
+    "%d-%m-%Y %H:%M",
+    "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%d.%m.%Y %H:%M",
+]
+
+
+def infer_date_format(values):
+    """Return the DATE_FORMATS entry that parses most of values, or None."""
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = 0
+        for value in values:
+            try:
+                datetime.datetime.strptime(value, date_format)
+                count += 1
+            except ValueError:
+                pass
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(values):
+                break
+    return best_format
+
+
+def parse_report_dates(values, sample_size=200):
+    """Parse a column of date strings in one pass.
+
+    The format is inferred from a sample, each distinct string is parsed once
+    with strptime, and only strings that don't match fall back to dateutil.
+    Unparseable dates become datetime.min so they sort first. Returns the
+    parsed dates and {"format", "fallback", "unparseable"} with row counts.
+    """
+    unique_values = list(dict.fromkeys(values))
+    step = max(1, len(unique_values) // sample_size)
+    date_format = infer_date_format([v.strip() for v in unique_values[::step] if v.strip()])
+
+    parsed = {}
+    fallback_values = set()
+    for value in unique_values:
+        if date_format is not None:
+            try:
+                parsed[value] = datetime.datetime.strptime(value.strip(), date_format)
+                continue
+            except ValueError:
+                pass
+        try:
+            # Deferred: dateutil is slow to import and rarely needed when a format is inferred
+            from dateutil import parser as dateparser
+            parsed[value] = dateparser.parse(value)
+            fallback_values.add(value)
+        except (ValueError, OverflowError):
+            parsed[value] = None
+
+    dates = []
+    fallback = unparseable = 0
+    for value in values:
+        date = parsed[value]
+        if date is None:
+            unparseable += 1
+            date = datetime.datetime.min
+        elif value in fallback_values:
+            fallback += 1
+        dates.append(date)
+
+    return dates, {
+        "format": date_format,
+        "fallback": fallback,
+        "unparseable": unparseable
+    }
+
+
+def describe_date_info(date_info):
+    """One-line summary of parse_report_dates statistics for the status bar."""
+    return (
+        f"Date format: {date_info.get('format') or 'mixed (dateutil)'} | "
+        f"Fallback parsed: {date_info.get('fallback', 0)} | "
+        f"Unparseable: {date_info.get('unparseable', 0)}"
+    )
+
+
+def load_reports(csv_path, headers=None):
+    """Read every report into memory as a dict, sorted by patient then date.
+
+    Returns the rows and the date parsing statistics from parse_report_dates.
+    """
+    headers = headers or DEFAULT_HEADERS
+    with open(csv_path, mode="r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        check_columns(reader.fieldnames, headers)
+
+        data = []
+        for row in reader:
+            # Store the original row data
+            processed_row = dict(row)
+
+            # Add standard field names to the row for internal use
+            processed_row["Patient-ID"] = row[headers['patient_id']]
+            processed_row["Report-ID"] = row[headers['report_id']]
+            processed_row["Report-Date"] = row[headers['report_date']]
+            processed_row["Text"] = row[headers['text']]
+
+            data.append(processed_row)
+
+    # Convert date strings to datetime objects for sorting
+    dates, date_info = parse_report_dates([row["Report-Date"] for row in data])
+    for row, date in zip(data, dates):
+        row["_parsed_date"] = date
+
+    # Sort all data by patient then date
+    data.sort(key=lambda x: (x["Patient-ID"], x["_parsed_date"]))
+    return data, date_info
+
+
+def iter_report_texts(csv_path, headers=None):
+    """Stream (report_id, text) pairs from the CSV in file order."""
+    headers = headers or DEFAULT_HEADERS
+    with open(csv_path, mode="r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [headers[key] for key in ('report_id', 'text') if headers[key] not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+        for row in reader:
+            yield row[headers['report_id']], row[headers['text']]
+
+
+class ReportRef:
+    """Compact stand-in for a report row whose text stays on disk.
+
+    Supports the same report["Patient-ID"] style lookups as the dicts from
+    load_reports, except for "Text", which is read through LazyReportIndex.
+    """
+
+    __slots__ = ("patient_id", "report_id", "report_date", "parsed_date", "offset")
+
+    _KEYS = {
+        "Patient-ID": "patient_id",
+        "Report-ID": "report_id",
+        "Report-Date": "report_date",
+        "_parsed_date": "parsed_date",
+        "_offset": "offset",
+    }
+
+    def __init__(self, patient_id, report_id, report_date, parsed_date, offset):
+        self.patient_id = patient_id
+        self.report_id = report_id
+        self.report_date = report_date
+        self.parsed_date = parsed_date
+        self.offset = offset
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self._KEYS else default
+
+
+class LazyReportIndex:
+    """Index of (patient, report, date, byte offset) per CSV row; texts are read on demand.
+
+    The index is cached in a sidecar file next to the CSV and reused as long
+    as the CSV size, modification time and column settings are unchanged.
+    """
+
+    VERSION = 2
+
+    def __init__(self, csv_path, headers=None):
+        self.csv_path = csv_path
+        self.headers = headers or DEFAULT_HEADERS
+        self.index_path = f"{csv_path}.index.json"
+        self.loaded_from_cache = False
+        self.date_info = {}
+        self._file = None
+        self._text_column = None
+        self._lock = threading.Lock()
+
+    def _cache_key(self):
+        stat = os.stat(self.csv_path)
+        return {
+            "version": self.VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "headers": self.headers,
+        }
+
+    def load(self):
+        """Return the sorted list of ReportRef, from the sidecar cache if it is still valid."""
+        key = self._cache_key()
+        reports = self._read_cache(key)
+        self.loaded_from_cache = reports is not None
+        if reports is None:
+            reports = self._build()
+            self._write_cache(key, reports)
+        return reports
+
+    def _lines(self, f, position):
+        # Decode line by line, tracking the byte offset where csv.reader will start next
+        for line in f:
+            position[0] += len(line)
+            yield line.decode("utf-8")
+
+    def _open_reader(self, f, offset):
+        # Offsets are counted from here, so the file must be positioned exactly at offset
+        f.seek(offset)
+        position = [offset]
+        return csv.reader(self._lines(f, position)), position
+
+    def _start_offset(self, f):
+        # Skip a UTF-8 byte order mark
+        return 3 if f.read(3) == b"\xef\xbb\xbf" else 0
+
+    def _build(self):
+        reports = []
+        with open(self.csv_path, "rb") as f:
+            reader, position = self._open_reader(f, self._start_offset(f))
+            header = next(reader, None)
+            check_columns(header, self.headers)
+            columns = {name: header.index(self.headers[name]) for name in DEFAULT_HEADERS}
+            self._text_column = columns['text']
+
+            while True:
+                offset = position[0]
+                row = next(reader, None)
+                if row is None:
+                    break
+                if not row:
+                    continue
+                reports.append(ReportRef(
+                    row[columns['patient_id']],
+                    row[columns['report_id']],
+                    row[columns['report_date']],
+                    None,
+                    offset
+                ))
+
+        dates, self.date_info = parse_report_dates([r.report_date for r in reports])
+        for report, date in zip(reports, dates):
+            report.parsed_date = date
+
+        # Sort all data by patient then date
+        reports.sort(key=lambda x: (x.patient_id, x.parsed_date))
+        return reports
+
+    def _read_cache(self, key):
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            with open(self.index_path, "r") as f:
+                cache = json.load(f)
+            if cache.get("key") != key:
+                return None
+            self._text_column = cache["text_column"]
+            self.date_info = cache["date_info"]
+            parse = datetime.datetime.fromisoformat
+            return [
+                ReportRef(patient_id, report_id, report_date, parse(parsed_date), offset)
+                for patient_id, report_id, report_date, parsed_date, offset in zip(
+                    cache["patient_ids"], cache["report_ids"], cache["report_dates"],
+                    cache["parsed_dates"], cache["offsets"])
+            ]
+        except Exception as e:
+            print(f"Ignoring report index cache: {str(e)}")
+            return None
+
+    def _write_cache(self, key, reports):
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "key": key,
+                    "text_column": self._text_column,
+                    "date_info": self.date_info,
+                    "patient_ids": [r.patient_id for r in reports],
+                    "report_ids": [r.report_id for r in reports],
+                    "report_dates": [r.report_date for r in reports],
+                    "parsed_dates": [r.parsed_date.isoformat() for r in reports],
+                    "offsets": [r.offset for r in reports],
+                }, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"Failed to write report index cache: {str(e)}")
+
+    def read_text(self, report):
+        """Read the report text for a ReportRef from the CSV."""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.csv_path, "rb")
+            reader, _ = self._open_reader(self._file, report.offset)
+            row = next(reader)
+            return row[self._text_column]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class PatientIndex:
+    """Row ranges per patient in the sorted report list, plus per-annotator completion counts.
+
+    Completion counts are computed from the annotation store the first time
+    an annotator is queried and then kept up to date through mark_annotated.
+    """
+
+    def __init__(self, data, store):
+        self.store = store
+        self.patients = []           # patient IDs in data order
+        self.ranges = {}             # patient_id -> (start, stop) rows in data
+        self.position = {}           # patient_id -> index into self.patients
+        self.patient_of_report = {}  # report_id -> patient_id
+
+        for i, report in enumerate(data):
+            patient_id = report["Patient-ID"]
+            if patient_id not in self.ranges:
+                self.position[patient_id] = len(self.patients)
+                self.patients.append(patient_id)
+                self.ranges[patient_id] = (i, i + 1)
+            else:
+                self.ranges[patient_id] = (self.ranges[patient_id][0], i + 1)
+            self.patient_of_report[report["Report-ID"]] = patient_id
+
+        self.reset_counts()
+
+    def reset_counts(self):
+        """Forget cached completion counts, e.g. after annotations were imported."""
+        self._annotated = {}  # annotator -> {patient_id: annotated report count}
+        self._completed = {}  # annotator -> number of fully annotated patients
+
+    def reports(self, data, patient_id):
+        start, stop = self.ranges[patient_id]
+        return data[start:stop]
+
+    def size(self, patient_id):
+        start, stop = self.ranges[patient_id]
+        return stop - start
+
+    def _counts(self, annotator):
+        if annotator not in self._annotated:
+            counts = {}
+            for report_id in self.store.for_annotator(annotator):
+                patient_id = self.patient_of_report.get(report_id)
+                if patient_id is not None:
+                    counts[patient_id] = counts.get(patient_id, 0) + 1
+            self._annotated[annotator] = counts
+            self._completed[annotator] = sum(
+                1 for patient_id, count in counts.items() if count == self.size(patient_id))
+        return self._annotated[annotator]
+
+    def mark_annotated(self, annotator, report_id):
+        """Record that annotator annotated report_id for the first time."""
+        patient_id = self.patient_of_report.get(report_id)
+        if patient_id is None or annotator not in self._annotated:
+            return  # Counted from the store when first needed
+        counts = self._annotated[annotator]
+        counts[patient_id] = counts.get(patient_id, 0) + 1
+        if counts[patient_id] == self.size(patient_id):
+            self._completed[annotator] += 1
+
+    def is_complete(self, annotator, patient_id):
+        return self._counts(annotator).get(patient_id, 0) == self.size(patient_id)
+
+    def completed_count(self, annotator):
+        self._counts(annotator)
+        return self._completed[annotator]
@@ -0,0 +1,232 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from array import array
+
+import numpy as np
+
+from reports import DEFAULT_HEADERS, iter_report_texts
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Reports whose postings are collected in memory before they are written out
+BUILD_BATCH_REPORTS = 20000
+
+# Words a prefix (the word still being typed) may expand to
+PREFIX_TERMS = 200
+
+
+def tokenize(text):
+    """Lowercase words and numbers; "PA-12345" gives "pa" and "12345"."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def search_index_path(csv_path):
+    """Sidecar file holding the full-text index of a report CSV."""
+    return f"{csv_path}.search.sqlite"
+
+
+def iter_position_texts(csv_path, data, headers):
+    """(position in data, text) for every report, so reports sharing a Report-ID are indexed apart."""
+    if data and isinstance(data[0], dict):
+        return ((i, report["Text"]) for i, report in enumerate(data))
+    # Lazily loaded reports: their offsets give file order, the order the CSV is streamed in
+    file_order = sorted(range(len(data)), key=lambda i: data[i]["_offset"])
+    return zip(file_order, (text for _, text in iter_report_texts(csv_path, headers)))
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+def file_hash(path, chunk_size=1024 * 1024, cancelled=None):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            if cancelled is not None and cancelled.is_set():
+                raise SearchCancelled()
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_key(csv_path, headers, data, cancelled=None):
+    """What an index is valid for: the CSV contents, the columns and the order reports are shown in."""
+    order = hashlib.sha1("\n".join(report["Report-ID"] for report in data).encode("utf-8")).hexdigest()
+    return json.dumps({
+        "version": TextIndex.VERSION,
+        "csv_sha1": file_hash(csv_path, cancelled=cancelled),
+        "headers": headers,
+        "order_sha1": order,
+    }, sort_keys=True)
+
+
+class TextIndex:
+    """Inverted index from words to report positions (indexes into the loaded report list).
+
+    Postings are stored per build batch as packed int32 arrays, so building
+    holds only one batch in memory and a lookup reads a handful of rows.
+    Lookups return sorted NumPy arrays, which merge and intersect quickly
+    even when a word is in most reports.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()  # Built on a worker thread, searched from the GUI
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    token TEXT NOT NULL,
+                    batch INTEGER NOT NULL,
+                    positions BLOB NOT NULL,
+                    PRIMARY KEY (token, batch)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def build(self, texts, cancelled=None):
+        """Index (position, text) pairs, replacing what was indexed before.
+
+        cancelled is a threading.Event; when it is set the build stops with
+        SearchCancelled and the index is left incomplete.
+        """
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM meta")
+
+        postings = {}
+        batch = 0
+        for count, (position, text) in enumerate(texts, 1):
+            if cancelled is not None and cancelled.is_set():
+                raise SearchCancelled()
+            for token in set(tokenize(text)):
+                if token not in postings:
+                    postings[token] = array('i')
+                postings[token].append(position)
+            if count % BUILD_BATCH_REPORTS == 0:
+                self._write_batch(batch, postings)
+                postings = {}
+                batch += 1
+        self._write_batch(batch, postings)
+
+    def _write_batch(self, batch, postings):
+        rows = []
+        for token, positions in postings.items():
+            positions = array('i', sorted(positions))
+            rows.append((token, batch, positions.tobytes()))
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT INTO postings (token, batch, positions) VALUES (?, ?, ?)", rows)
+
+    def _positions(self, rows, distinct=True):
+        # A report is in one batch only, so the batches of one token never overlap
+        arrays = [np.frombuffer(blob, dtype=np.int32) for (blob,) in rows]
+        if not arrays:
+            return np.empty(0, dtype=np.int32)
+        if len(arrays) == 1:
+            return arrays[0]
+        merged = np.concatenate(arrays)
+        if distinct:
+            return np.sort(merged)
+        seen = np.zeros(int(merged.max()) + 1, dtype=bool)
+        seen[merged] = True
+        return np.flatnonzero(seen)
+
+    def lookup(self, token, prefix=False):
+        """Sorted positions of reports containing token (or, with prefix, any word starting with it)."""
+        with self._lock:
+            if not prefix:
+                return self._positions(self.conn.execute(
+                    "SELECT positions FROM postings WHERE token = ?", (token,)))
+            tokens = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT token FROM postings WHERE token >= ? AND token < ? ORDER BY token LIMIT ?",
+                (token, token + "\U0010ffff", PREFIX_TERMS))]
+            if not tokens:
+                return np.empty(0, dtype=np.int32)
+            marks = ",".join("?" * len(tokens))
+            rows = self.conn.execute(f"SELECT positions FROM postings WHERE token IN ({marks})", tokens)
+            return self._positions(rows, distinct=len(tokens) == 1)
+
+    def search(self, query):
+        """Sorted positions of reports containing every word of query.
+
+        The last word is matched as a prefix unless the query ends in a space,
+        so results follow the text as it is typed.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        prefix_last = not query[-1].isspace()
+        matches = None
+        for i, token in enumerate(tokens):
+            found = self.lookup(token, prefix=prefix_last and i == len(tokens) - 1)
+            matches = found if matches is None else np.intersect1d(matches, found, assume_unique=True)
+            if not len(matches):
+                return []
+        return matches.tolist()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_search_index(csv_path, data, headers=None, cancelled=None):
+    """The full-text index for data (as loaded from csv_path), from its sidecar or built now.
+
+    A sidecar whose key does not match (the CSV, columns or report order
+    changed) is rebuilt. If the sidecar cannot be written the index is
+    built in memory.
+    """
+    headers = headers or DEFAULT_HEADERS
+    key = index_key(csv_path, headers, data, cancelled)
+    path = search_index_path(csv_path)
+
+    if os.path.exists(path):
+        try:
+            index = TextIndex(path)
+            if index.get_meta("key") == key:
+                return index
+            index.close()
+        except sqlite3.Error as e:
+            print(f"Ignoring unreadable search index: {str(e)}")
+
+    texts = iter_position_texts(csv_path, data, headers)
+
+    # Build in a file of its own next to the sidecar and swap it in, so an interrupted
+    # build leaves no half index behind and concurrent builds do not share a file
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        index = TextIndex(tmp_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not write search index, keeping it in memory: {str(e)}")
+        index = TextIndex(":memory:")
+        index.build(texts, cancelled)
+        return index
+
+    try:
+        try:
+            index.build(texts, cancelled)
+            index.set_meta("key", key)
+        finally:
+            index.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return TextIndex(path)
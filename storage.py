@@ -0,0 +1,500 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+
+
+class AnnotationStore:
+    """In-memory annotation records indexed by annotator, report and patient."""
+
+    def __init__(self, records=None):
+        self._by_key = {}        # (annotator, report_id) -> record, in save order
+        self._by_annotator = {}  # annotator -> {report_id: record}
+        self._by_patient = {}    # patient_id -> {(annotator, report_id): record}
+        for record in records or []:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __iter__(self):
+        return iter(list(self._by_key.values()))
+
+    def __bool__(self):
+        return bool(self._by_key)
+
+    def add(self, record):
+        """Insert a record, replacing any earlier one from the same annotator for the same report."""
+        key = (record["annotator"], record["report_id"])
+        self.remove(*key)
+
+        self._by_key[key] = record
+        self._by_annotator.setdefault(key[0], {})[key[1]] = record
+        self._by_patient.setdefault(record.get("patient_id"), {})[key] = record
+
+    def remove(self, annotator, report_id):
+        """Drop the record for an annotator/report pair if there is one."""
+        record = self._by_key.pop((annotator, report_id), None)
+        if record is None:
+            return None
+
+        self._by_annotator[annotator].pop(report_id, None)
+        patient_records = self._by_patient.get(record.get("patient_id"), {})
+        patient_records.pop((annotator, report_id), None)
+        return record
+
+    def get(self, annotator, report_id):
+        """Return the record for an annotator/report pair, or None."""
+        return self._by_key.get((annotator, report_id))
+
+    def has(self, annotator, report_id):
+        """Check whether an annotator has annotated a report."""
+        return (annotator, report_id) in self._by_key
+
+    def for_annotator(self, annotator):
+        """Return {report_id: record} for everything an annotator has saved."""
+        return self._by_annotator.get(annotator, {})
+
+    def for_patient(self, patient_id):
+        """Return all records (any annotator) belonging to a patient."""
+        return list(self._by_patient.get(patient_id, {}).values())
+
+    def count(self, annotator):
+        """Number of reports annotated by an annotator."""
+        return len(self._by_annotator.get(annotator, {}))
+
+    def annotators(self):
+        return [name for name, records in self._by_annotator.items() if records]
+
+    def to_list(self):
+        """Flat list of records, as written to the output file."""
+        return list(self._by_key.values())
+
+
+def read_annotation_file(path):
+    """Read records from an exported annotation file ({"annotations": [...]} or a bare list)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "annotations" in data:
+        return data["annotations"]
+    elif isinstance(data, list):
+        return data
+    return []
+
+
+def iter_annotation_file(path, chunk_size=65536):
+    """Yield records from an annotation file one at a time, reading it in chunks.
+
+    Handles the same layouts as read_annotation_file, but never holds more
+    than one record (plus a chunk) in memory.
+    """
+    if not os.path.exists(path):
+        return
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer, position = "", 0
+
+        def fill():
+            nonlocal buffer, position
+            chunk = f.read(chunk_size)
+            buffer, position = buffer[position:] + chunk, 0
+            return bool(chunk)
+
+        def peek(skip=""):
+            # Next character after whitespace and any of skip, or "" at end of file
+            nonlocal position
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or buffer[position] in skip):
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    return ""
+
+        def value():
+            nonlocal position
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if not fill():
+                        raise
+                    continue
+                position = end
+                return obj
+
+        def array():
+            nonlocal position
+            position += 1
+            while True:
+                char = peek(",")
+                if char == "]":
+                    position += 1
+                    return
+                if not char:
+                    raise ValueError(f"Unexpected end of {path}")
+                yield value()
+
+        char = peek()
+        if char == "[":
+            yield from array()
+        elif char == "{":
+            position += 1
+            while peek(",") not in ("}", ""):
+                key = value()
+                peek(":")
+                if key == "annotations" and peek() == "[":
+                    yield from array()
+                else:
+                    value()
+
+
+def write_annotation_file(path, records, indent=2):
+    """Atomically write records as {"annotations": [...]} (temp file, fsync, rename).
+
+    records may be any iterable; it is written one record at a time, so a
+    generator is never held in memory as a whole. The output is the same as
+    json.dump of the whole object.
+    """
+    # Layout of json.dump: newline and indentation before each nested level, or none
+    outer = "" if indent is None else "\n" + " " * indent
+    inner = "" if indent is None else outer + " " * indent
+    item_separator = ", " if indent is None else ","
+    timestamp = json.dumps(datetime.datetime.now().isoformat())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('{' + outer + '"annotations": [')
+        written = False
+        for record in records:
+            f.write((item_separator if written else "") + inner)
+            f.write(json.dumps(record, indent=indent).replace("\n", inner))
+            written = True
+        f.write((outer if written else "") + "]" + item_separator + outer + '"timestamp": ' + timestamp
+                + ("" if indent is None else "\n") + "}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AnnotationJournal:
+    """Append-only JSONL journal of saves on top of a {"annotations": [...]} snapshot.
+
+    Every save appends one line holding the records it wrote. Loading replays
+    the journal over the snapshot, last write wins per (annotator, report).
+    Compaction folds the journal into the snapshot on a background thread.
+    """
+
+    COMPACT_EVERY = 500  # journal lines before an automatic compaction
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal.jsonl"
+        self._lock = threading.Lock()
+        self._compaction = None
+        self.pending_lines = 0
+
+    def load(self):
+        """Return an AnnotationStore with the snapshot plus the replayed journal."""
+        store = AnnotationStore(read_annotation_file(self.snapshot_path))
+        self.pending_lines = 0
+        for entry in self._read_journal():
+            for record in entry.get("annotations", []):
+                store.add(record)
+            self.pending_lines += 1
+        return store
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves a partial last line; skip it
+                    continue
+
+    def append(self, records):
+        """Durably append one save (a list of annotation records) to the journal."""
+        line = json.dumps({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "annotations": records
+        })
+        with self._lock:
+            with open(self.journal_path, 'a+b') as f:
+                # Terminate a partial line left by a crash so this save stays readable
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(line.encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending_lines += 1
+
+    def write_snapshot(self, records):
+        """Replace the snapshot with records and drop the now redundant journal."""
+        self.wait()
+        with self._lock:
+            write_annotation_file(self.snapshot_path, records)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.pending_lines = 0
+
+    def needs_compaction(self):
+        return self.pending_lines >= self.COMPACT_EVERY
+
+    def compact(self, records, background=True):
+        """Fold the journal into the snapshot.
+
+        records must be the full current state (e.g. store.to_list()). Journal
+        lines appended while the snapshot is written are kept; replaying lines
+        already folded in is harmless because last write wins.
+        """
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        with self._lock:
+            offset = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+            self.pending_lines = 0
+
+        if background:
+            self._compaction = threading.Thread(
+                target=self._compact, args=(records, offset), daemon=True)
+            self._compaction.start()
+        else:
+            self._compact(records, offset)
+
+    def _compact(self, records, offset):
+        try:
+            write_annotation_file(self.snapshot_path, records, indent=None)
+            with self._lock:
+                if not os.path.exists(self.journal_path):
+                    return
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+                tmp_path = f"{self.journal_path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.journal_path)
+                self.pending_lines = tail.count(b"\n")
+        except Exception as e:
+            print(f"Failed to compact annotation journal: {str(e)}")
+
+    def wait(self):
+        """Block until a running background compaction has finished."""
+        if self._compaction is not None:
+            self._compaction.join()
+
+
+class JSONBackend:
+    """Annotations in a {"annotations": [...]} JSON file, optionally saved through an AnnotationJournal.
+
+    Every plain save rewrites the whole file, so annotators must not share one
+    output file; use the SQLite backend for that.
+    """
+
+    name = "json"
+
+    def __init__(self, path, journal_mode=False):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.journal = AnnotationJournal(path)
+
+    def load(self):
+        # Snapshot plus any journaled saves (the journal may exist from an earlier session)
+        store = self.journal.load()
+        if self.journal_mode and self.journal.pending_lines:
+            self.journal.compact(store.to_list())
+        return store
+
+    def iter_records(self):
+        """Stream all records; only the journal is held in memory."""
+        newer = {}
+        for entry in self.journal._read_journal():
+            for record in entry.get("annotations", []):
+                key = (record.get("annotator"), record.get("report_id"))
+                newer.pop(key, None)
+                newer[key] = record
+        for record in iter_annotation_file(self.path):
+            # .get: malformed records are passed on for the caller (e.g. validate) to report
+            if (record.get("annotator"), record.get("report_id")) not in newer:
+                yield record
+        yield from newer.values()
+
+    def save(self, records, all_records):
+        """Persist records just saved; all_records is the full current state (a list)."""
+        if self.journal_mode:
+            self.journal.append(records)
+            if self.journal.needs_compaction():
+                self.journal.compact(all_records)
+        else:
+            self.journal.write_snapshot(all_records)
+
+    def close(self):
+        self.journal.wait()
+
+
+class SQLiteBackend:
+    """Annotations in a SQLite database (WAL mode), one upserted row per annotator/report.
+
+    Saves only touch the rows being saved, so several annotators can write to
+    the same database without overwriting each other. WAL coordinates writers
+    through shared memory, so they must all run on the computer that holds the
+    database (e.g. a shared workstation); it does not work on network shares.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS annotations (
+                    annotator TEXT NOT NULL,
+                    report_id TEXT NOT NULL,
+                    patient_id TEXT,
+                    timestamp TEXT,
+                    combined_report_ids TEXT,
+                    annotation TEXT NOT NULL,
+                    PRIMARY KEY (annotator, report_id)
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_annotations_patient ON annotations (patient_id)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_annotations_report ON annotations (report_id)")
+
+    def load(self):
+        return AnnotationStore(self.iter_records())
+
+    def iter_records(self):
+        """Stream all records, oldest save first."""
+        rows = self.conn.execute("""
+            SELECT annotator, report_id, patient_id, timestamp, combined_report_ids, annotation
+            FROM annotations ORDER BY timestamp
+        """)
+        for annotator, report_id, patient_id, timestamp, combined_report_ids, annotation in rows:
+            record = {
+                "annotator": annotator,
+                "patient_id": patient_id,
+                "report_id": report_id,
+                "timestamp": timestamp,
+                "annotation": json.loads(annotation)
+            }
+            if combined_report_ids is not None:
+                record["combined_report_ids"] = combined_report_ids
+            yield record
+
+    def save(self, records, all_records=None):
+        """Upsert records; rows for other annotators/reports are left alone."""
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO annotations
+                    (annotator, report_id, patient_id, timestamp, combined_report_ids, annotation)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (annotator, report_id) DO UPDATE SET
+                    patient_id = excluded.patient_id,
+                    timestamp = excluded.timestamp,
+                    combined_report_ids = excluded.combined_report_ids,
+                    annotation = excluded.annotation
+            """, [
+                (
+                    r["annotator"],
+                    r["report_id"],
+                    r.get("patient_id"),
+                    r.get("timestamp"),
+                    r.get("combined_report_ids"),
+                    json.dumps(r.get("annotation", {}))
+                )
+                for r in records
+            ])
+
+    def close(self):
+        self.conn.close()
+
+
+BACKENDS = {
+    JSONBackend.name: JSONBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+
+def backend_for_path(path):
+    """Guess the backend name from a file extension."""
+    return SQLiteBackend.name if path.lower().endswith(SQLITE_EXTENSIONS) else JSONBackend.name
+
+
+def open_backend(name, path, journal_mode=False):
+    """Open the storage backend called name on path."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if name == JSONBackend.name:
+        return JSONBackend(path, journal_mode=journal_mode)
+    return BACKENDS[name](path)
+
+
+def iter_annotations(path, backend=None):
+    """Stream every record of an annotation file (JSON, journal or SQLite) without loading it all."""
+    source = open_backend(backend or backend_for_path(path), path)
+    try:
+        yield from source.iter_records()
+    finally:
+        source.close()
+
+
+def copy_annotations(source_path, target_path, source_backend=None, target_backend=None, batch_size=1000):
+    """Copy every annotation from one annotation file to another, e.g. JSON to SQLite.
+
+    Backends default to what the file extensions suggest. Existing records in
+    the target are kept unless the source has one for the same annotator/report.
+    SQLite targets are filled in batches. A JSON target is rewritten by
+    streaming its records and the source's into a new file, reading the
+    source twice; only the annotator/report keys of the source are held in
+    memory. Returns the number of records copied.
+    """
+    target = open_backend(target_backend or backend_for_path(target_path), target_path)
+    count = 0
+    try:
+        records = iter_annotations(source_path, source_backend)
+        if isinstance(target, SQLiteBackend):
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    target.save(batch)
+                    count += len(batch)
+                    batch = []
+            target.save(batch)
+            return count + len(batch)
+
+        # Position of the last source record per annotator/report, which is the one that wins
+        latest = {}
+        for count, record in enumerate(records, 1):
+            latest[(record.get("annotator"), record.get("report_id"))] = count
+
+        def merged():
+            for record in target.iter_records():
+                if (record.get("annotator"), record.get("report_id")) not in latest:
+                    yield record
+            for position, record in enumerate(iter_annotations(source_path, source_backend), 1):
+                if latest[(record.get("annotator"), record.get("report_id"))] == position:
+                    yield record
+
+        target.journal.write_snapshot(merged())
+        return count
+    finally:
+        target.close()
@@ -0,0 +1,92 @@
+import datetime
+
+
+def read_task_config(yaml_path):
+    """Load and validate YAML task file."""
+    import yaml  # Deferred: only needed once a project is opened
+
+    try:
+        with open(yaml_path, 'r') as f:
+            config = yaml.safe_load(f)
+            if "groups" not in config:
+                raise ValueError("YAML must contain 'groups' key.")
+            return config
+    except Exception as e:
+        raise ValueError(f"Invalid YAML: {str(e)}")
+
+
+def iter_controls(items):
+    """Yield the config of every control in a YAML groups list, in the order the UI shows them."""
+    for item in items:
+        if "controls" in item:
+            yield from iter_controls(item["controls"])
+        elif "groups" in item:
+            yield from iter_controls(item["groups"])
+        else:
+            yield item
+
+
+def is_mapper(control):
+    return control["type"] == "text" and control.get("mapper", False)
+
+
+def check_value(control, value):
+    """Return a problem with a saved value for a control, or None if it looks right."""
+    kind = control["type"]
+    if is_mapper(control):
+        if not isinstance(value, dict) or not isinstance(value.get("text", ""), str):
+            return "expected a UMLS mapper value"
+    elif kind == "slider":
+        if not isinstance(value, int) or isinstance(value, bool):
+            return "expected a whole number"
+        if not control["min"] <= value <= control["max"]:
+            return f"{value} is outside {control['min']}-{control['max']}"
+    elif kind in ("radio", "dropdown"):
+        if value is not None and value not in control["options"]:
+            return f"'{value}' is not one of the options"
+    elif kind == "checkbox":
+        if not isinstance(value, bool):
+            return "expected true or false"
+    elif kind in ("text", "autocomplete"):
+        if not isinstance(value, str):
+            return "expected text"
+    elif kind == "date":
+        if value is not None:
+            try:
+                datetime.datetime.strptime(value, "%d-%m-%Y")
+            except (TypeError, ValueError):
+                return f"'{value}' is not a dd-mm-yyyy date"
+    return None
+
+
+def is_filled(control, value):
+    """Whether a required control counts as filled in, by the same rules as the app."""
+    kind = control["type"]
+    if is_mapper(control):
+        return True  # UMLS linking is never enforced
+    if kind == "slider":
+        return value is not None and value != control["min"]
+    if kind in ("text", "autocomplete"):
+        return bool(str(value or "").strip())
+    if kind == "date":
+        return True
+    return bool(value)
+
+
+def validate_annotation(annotation, controls):
+    """Problems with one record's annotation dict; controls maps label -> control config."""
+    problems = []
+    for label, value in annotation.items():
+        if label.startswith("_"):
+            continue  # Bookkeeping such as _grouped_reports
+        control = controls.get(label)
+        if control is None:
+            problems.append(f"'{label}' is not in the task")
+            continue
+        problem = check_value(control, value)
+        if problem:
+            problems.append(f"'{label}': {problem}")
+    for label, control in controls.items():
+        if control.get("required", False) and not is_filled(control, annotation.get(label)):
+            problems.append(f"'{label}' is required but empty")
+    return problems
@@ -0,0 +1,444 @@
+"""UMLS linking with scispacy, in-process or through a shared local linking server.
+
+Loading the scispacy linker takes minutes and several GB of memory, so one
+server process can load it once and answer searches from every running
+annotator:
+
+    python umls.py serve --port 8765
+
+Candidates for every report can also be linked ahead of time, so mapper
+dropdowns are filled without loading the linker at all:
+
+    python umls.py prelink reports.csv --workers 4
+"""
+import os
+import sys
+import json
+import socket
+import sqlite3
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+
+from reports import DEFAULT_HEADERS, iter_report_texts
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LINKER_NAME = "umls"
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ReportAnnotationGUI", "umls_cache.sqlite")
+DEFAULT_NER_MODEL = "en_core_sci_sm"
+
+
+def load_linker():
+    """Build a blank spaCy pipeline with the scispacy UMLS linker."""
+    import spacy
+    from scispacy.linking import EntityLinker
+    nlp = spacy.blank("en")
+    nlp.add_pipe("scispacy_linker", config={
+        "resolve_abbreviations": True,
+        "linker_name": LINKER_NAME
+    })
+    return nlp
+
+
+def linker_version():
+    """Identify the installed linker and KB, so cached results don't outlive an upgrade."""
+    try:
+        from importlib.metadata import version
+        scispacy_version = version("scispacy")
+    except Exception:
+        scispacy_version = "unknown"
+    return f"scispacy-{scispacy_version}/{LINKER_NAME}"
+
+
+def link_text(nlp, text, limit=10):
+    """Link the whole of text as one entity; return up to limit candidate concepts."""
+    if not isinstance(text, str) or not text.strip():
+        return []
+
+    # Create a Doc object from the full string
+    doc = nlp(text)
+
+    # Force a single-span entity over the entire string
+    span = doc.char_span(0, len(text), label="ENTITY")
+    if span is None:
+        return []
+
+    doc.ents = [span]
+
+    # Run the linker
+    linker = nlp.get_pipe("scispacy_linker")
+    doc = linker(doc)
+
+    candidates = []
+    for concept_id, score in doc.ents[0]._.kb_ents[:limit]:
+        concept = linker.kb.cui_to_entity[concept_id]
+        candidates.append({
+            'cui': concept_id,
+            'canonical_name': concept.canonical_name,
+            'score': float(score),
+            'types': list(concept.types)
+        })
+    return candidates
+
+
+class UMLSCache:
+    """Search results cache: an in-memory LRU in front of a persistent SQLite table.
+
+    Queries are normalized (case and whitespace) and keyed by linker version,
+    so upgrading scispacy or its KB starts a fresh cache.
+    """
+
+    def __init__(self, version, path=DEFAULT_CACHE_PATH, max_entries=2048):
+        self.version = version
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+                with self._db:
+                    self._db.execute("""
+                        CREATE TABLE IF NOT EXISTS results (
+                            version TEXT NOT NULL,
+                            query TEXT NOT NULL,
+                            result_limit INTEGER NOT NULL,
+                            results TEXT NOT NULL,
+                            PRIMARY KEY (version, query, result_limit)
+                        )
+                    """)
+            except sqlite3.Error as e:
+                print(f"UMLS cache disabled on disk: {str(e)}")
+                self._db = None
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.lower().split())
+
+    def get(self, text, limit=10):
+        """Return cached results for text, or None."""
+        key = (self.normalize(text), limit)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT results FROM results WHERE version = ? AND query = ? AND result_limit = ?",
+                        (self.version, key[0], limit)
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            results = json.loads(row[0])
+            self._remember(key, results)
+            return results
+
+    def put(self, text, limit, results):
+        key = (self.normalize(text), limit)
+        with self._lock:
+            self._remember(key, results)
+            if self._db is not None:
+                try:
+                    with self._db:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO results (version, query, result_limit, results) VALUES (?, ?, ?, ?)",
+                            (self.version, key[0], limit, json.dumps(results))
+                        )
+                except sqlite3.Error as e:
+                    print(f"Failed to write UMLS cache: {str(e)}")
+
+    def _remember(self, key, results):
+        self._memory[key] = results
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def describe(self):
+        stats = self.stats()
+        return (
+            f"UMLS cache: {stats['memory_hits']} memory / {stats['disk_hits']} disk hits, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)"
+        )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def cached_link(cache, search, text, limit=10):
+    """Look text up in cache, calling search(text, limit) and storing the result on a miss."""
+    results = cache.get(text, limit) if cache is not None else None
+    if results is None:
+        results = search(text, limit)
+        if cache is not None:
+            cache.put(text, limit, results)
+    return results
+
+
+class _LinkingHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line: {"text": ..., "limit": ...} or {"ping": true}
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("ping"):
+                    response = {"ok": True, "version": self.server.version}
+                else:
+                    response = {"results": cached_link(
+                        self.server.cache, self.server.link, request.get("text", ""), request.get("limit", 10))}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class UMLSServer(socketserver.ThreadingTCPServer):
+    """Localhost server that loads the linker once and serves link_text requests."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, nlp=None, cache_path=DEFAULT_CACHE_PATH):
+        super().__init__((host, port), _LinkingHandler)
+        self.nlp = nlp if nlp is not None else load_linker()
+        self.version = linker_version()
+        self.cache = UMLSCache(self.version, cache_path)
+        self.lock = threading.Lock()  # spaCy pipelines are not thread safe
+
+    def link(self, text, limit=10):
+        with self.lock:
+            return link_text(self.nlp, text, limit)
+
+
+class UMLSClient:
+    """Client for a running UMLSServer."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.version = None  # Linker version reported by the server
+
+    def _request(self, payload, timeout=None):
+        with socket.create_connection((self.host, self.port), timeout=timeout or self.timeout) as sock:
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def is_available(self):
+        """Check quickly whether a server is listening."""
+        try:
+            response = self._request({"ping": True}, timeout=0.5)
+        except (OSError, ValueError, RuntimeError):
+            return False
+        self.version = response.get("version", "unknown")
+        return bool(response.get("ok"))
+
+    def search(self, text, limit=10):
+        return self._request({"text": text, "limit": limit})["results"]
+
+
+def prelink_path(csv_path):
+    """Sidecar file holding pre-linked candidates for a report CSV."""
+    return f"{csv_path}.umls.sqlite"
+
+
+class PrelinkIndex:
+    """Top-k UMLS candidates per report, written by prelink_reports.
+
+    Opening and reading the index does not need scispacy at all.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()  # Read from the GUI and the prefetch thread
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS candidates (
+                    report_id TEXT PRIMARY KEY,
+                    candidates TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, report_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT candidates FROM candidates WHERE report_id = ?", (report_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def linked_report_ids(self):
+        return {row[0] for row in self.conn.execute("SELECT report_id FROM candidates")}
+
+    def put_many(self, items):
+        """Store (report_id, candidates) pairs."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candidates (report_id, candidates) VALUES (?, ?)",
+                [(report_id, json.dumps(candidates)) for report_id, candidates in items]
+            )
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def load_ner_linker(model=DEFAULT_NER_MODEL):
+    """Load a scispacy NER model with abbreviation detection and the UMLS linker."""
+    import spacy
+    from scispacy.abbreviation import AbbreviationDetector
+    from scispacy.linking import EntityLinker
+    nlp = spacy.load(model)
+    nlp.add_pipe("abbreviation_detector")
+    nlp.add_pipe("scispacy_linker", config={
+        "resolve_abbreviations": True,
+        "linker_name": LINKER_NAME
+    })
+    return nlp
+
+
+def doc_candidates(doc, linker, top_k=10):
+    """Best-scoring concepts over all entities in doc, one entry per CUI."""
+    best = {}
+    for ent in doc.ents:
+        for concept_id, score in ent._.kb_ents:
+            if concept_id not in best or score > best[concept_id]['score']:
+                concept = linker.kb.cui_to_entity[concept_id]
+                best[concept_id] = {
+                    'cui': concept_id,
+                    'canonical_name': concept.canonical_name,
+                    'score': float(score),
+                    'types': list(concept.types),
+                    'mention': ent.text
+                }
+    return sorted(best.values(), key=lambda c: c['score'], reverse=True)[:top_k]
+
+
+def prelink_reports(csv_path, output_path=None, headers=None, model=DEFAULT_NER_MODEL,
+                    top_k=10, workers=1, batch_size=64, progress=None):
+    """Run NER plus linking over every report and store the top-k candidates per report.
+
+    Texts are streamed through nlp.pipe in batches (across `workers`
+    processes). Reports already in the index are skipped, so an interrupted
+    run can be resumed. Returns the number of reports linked.
+    """
+    index = PrelinkIndex(output_path or prelink_path(csv_path))
+    try:
+        done = index.linked_report_ids()
+        nlp = load_ner_linker(model)
+        linker = nlp.get_pipe("scispacy_linker")
+        index.set_meta("version", linker_version())
+        index.set_meta("model", model)
+
+        todo = ((text, report_id) for report_id, text in iter_report_texts(csv_path, headers) if report_id not in done)
+        docs = nlp.pipe(todo, as_tuples=True, batch_size=batch_size, n_process=workers)
+
+        linked = 0
+        batch = []
+        for doc, report_id in docs:
+            batch.append((report_id, doc_candidates(doc, linker, top_k)))
+            if len(batch) >= batch_size:
+                index.put_many(batch)
+                linked += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(linked)
+        index.put_many(batch)
+        linked += len(batch)
+        return linked
+    finally:
+        index.close()
+
+
+def parse_address(address):
+    """Parse "host:port" (or just "port") into a (host, port) tuple."""
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UMLS linking server for the Patient Report Annotator')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Load the linker once and serve searches')
+    serve_parser.add_argument('--host', default=DEFAULT_HOST, help='Interface to listen on (default: localhost only)')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    serve_parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='Persistent search results cache')
+
+    search_parser = subparsers.add_parser('search', help='Query a running server')
+    search_parser.add_argument('text', help='Text to link')
+    search_parser.add_argument('--host', default=DEFAULT_HOST)
+    search_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    prelink_parser = subparsers.add_parser('prelink', help='Link all reports in a CSV ahead of time')
+    prelink_parser.add_argument('csv', help='Report CSV file')
+    prelink_parser.add_argument('--output', help='Candidate index (default: <csv>.umls.sqlite, loaded by the app)')
+    prelink_parser.add_argument('--model', default=DEFAULT_NER_MODEL, help='scispacy NER model')
+    prelink_parser.add_argument('--top-k', type=int, default=10, help='Candidates to keep per report')
+    prelink_parser.add_argument('--workers', type=int, default=1, help='Processes for nlp.pipe')
+    prelink_parser.add_argument('--batch-size', type=int, default=64)
+    prelink_parser.add_argument('--report-id-column', default=DEFAULT_HEADERS['report_id'])
+    prelink_parser.add_argument('--text-column', default=DEFAULT_HEADERS['text'])
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        print("Loading UMLS linker, this takes some time...")
+        server = UMLSServer(args.host, args.port, cache_path=args.cache)
+        print(f"Serving UMLS searches on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    elif args.command == 'prelink':
+        headers = dict(DEFAULT_HEADERS, report_id=args.report_id_column, text=args.text_column)
+        count = prelink_reports(
+            args.csv, args.output, headers=headers, model=args.model, top_k=args.top_k,
+            workers=args.workers, batch_size=args.batch_size,
+            progress=lambda n: print(f"Linked {n} reports", flush=True)
+        )
+        print(f"Linked {count} reports into {args.output or prelink_path(args.csv)}")
+    elif args.command == 'search':
+        for candidate in UMLSClient(args.host, args.port).search(args.text):
+            print(f"{candidate['cui']}\t{candidate['score']:.2f}\t{candidate['canonical_name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
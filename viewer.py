@@ -0,0 +1,98 @@
+from collections import deque
+
+from PyQt5.QtWidgets import QTextEdit
+from PyQt5.QtGui import QTextCursor
+
+
+class ReportViewer(QTextEdit):
+    """Read-only view of one or more reports, rendered incrementally as the user scrolls.
+
+    Reports are appended to the document in chunks of at most CHUNK_CHARS;
+    only the first BATCH_CHARS are rendered up front and more are added when
+    the view gets within PREFETCH_PAGES viewport heights of the end. Report
+    texts are only fetched (text_of) once rendering reaches them. The same
+    document is cleared and refilled for every view.
+    """
+
+    CHUNK_CHARS = 16384
+    BATCH_CHARS = 65536
+    PREFETCH_PAGES = 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.reports = []
+        self.text_of = None
+        self.next_report = 0  # Index of the first report not yet queued
+        self.pending = deque()  # Chunks of queued reports not yet in the document
+        self.report_positions = {}  # report index -> document position of its header
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+
+    def set_reports(self, reports, text_of):
+        """Show reports (dicts with Report-ID/Report-Date); text_of(report) returns the text."""
+        self.reports = reports
+        self.text_of = text_of
+        self.next_report = 0
+        self.pending.clear()
+        self.report_positions = {}
+        self.document().clear()
+        self.render_more(self.BATCH_CHARS)
+        self.verticalScrollBar().setValue(0)
+
+    def is_complete(self):
+        return not self.pending and self.next_report >= len(self.reports)
+
+    def render_more(self, budget):
+        """Append at least budget characters (or whatever is left) to the document."""
+        if self.is_complete():
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        while budget > 0:
+            if not self.pending:
+                if self.next_report >= len(self.reports):
+                    break
+                self.queue_report(self.next_report, cursor.position())
+            chunk = self.pending.popleft()
+            cursor.insertText(chunk)
+            budget -= len(chunk)
+        cursor.endEditBlock()
+
+    def queue_report(self, index, position):
+        report = self.reports[index]
+        separator = "\n\n\n" if index else ""
+        self.report_positions[index] = position + len(separator)
+        text = f"{separator}{self.report_header(report)}{self.text_of(report)}"
+        for start in range(0, len(text), self.CHUNK_CHARS):
+            self.pending.append(text[start:start + self.CHUNK_CHARS])
+        self.next_report += 1
+
+    def report_header(self, report):
+        return f"=== Report {report['Report-ID']} ({report['Report-Date']}) ===\n\n"
+
+    def on_scroll(self, value):
+        bar = self.verticalScrollBar()
+        if value >= bar.maximum() - self.PREFETCH_PAGES * bar.pageStep():
+            self.render_more(self.BATCH_CHARS)
+
+    def show_report(self, index, offset=0, length=0):
+        """Scroll to a report (offset characters into its block, header included), rendering up to it first.
+
+        With length, that many characters from there on are selected.
+        """
+        while index not in self.report_positions and not self.is_complete():
+            self.render_more(self.BATCH_CHARS)
+        if index not in self.report_positions:
+            return
+        target = self.report_positions[index] + offset
+        while self.document().characterCount() <= target and not self.is_complete():
+            self.render_more(self.BATCH_CHARS)
+        cursor = QTextCursor(self.document())
+        end = self.document().characterCount() - 1
+        cursor.setPosition(min(target, end))
+        if length:
+            cursor.setPosition(min(target + length, end), QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()